@@ -0,0 +1,178 @@
+import asyncio
+import time
+from extension import Telegram, TELEGRAM_API_URL, TELEGRAM_POOL_MAXSIZE
+
+# Bot API limits: ~30 msg/s for the whole bot, ~20 msg/min per group/channel
+GLOBAL_RATE = 30
+GLOBAL_BURST = 30
+CHAT_RATE = 20 / 60
+CHAT_BURST = 3
+MAX_RETRIES = 3
+
+
+class DeadlineExceeded(Exception):
+    """A rate-limit wait would end after the caller's deadline."""
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, at most `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return now
+
+    async def acquire(self, deadline: float = None):
+        """Wait for a token; raises DeadlineExceeded instead of waiting past
+        `deadline` (a time.monotonic() value)."""
+        while True:
+            now = self._refill()
+            if now < self.blocked_until:
+                wait = self.blocked_until - now
+            elif self.tokens >= 1:
+                self.tokens -= 1
+                return
+            else:
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                raise DeadlineExceeded(f"token wait of {wait:.1f}s passes the deadline")
+            await asyncio.sleep(wait)
+
+    def block(self, seconds: float):
+        """Hand out nothing for `seconds`, e.g. after a 429 retry_after."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+
+class AsyncTelegram(Telegram):
+    """asyncio sibling of extension.Telegram with Bot API rate limiting.
+
+    Every call waits for a token from its chat's bucket and from the
+    bot-wide bucket. Calls to the same chat are serialised so replies keep
+    their order. A 429 blocks the chat and the whole bot for `retry_after`
+    seconds (a flood wait is bot-wide) and the call is retried up to
+    MAX_RETRIES times.
+
+    `deadline` (time.monotonic(), None for no limit) bounds all of that
+    waiting: a call that would have to wait past it raises
+    DeadlineExceeded, or returns the 429, instead of sleeping.
+    """
+
+    def __init__(self, token: str, client: "httpx.AsyncClient" = None, api_url: str = TELEGRAM_API_URL,
+                 global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE, chat_burst: float = CHAT_BURST):
+        super().__init__(token, api_url=api_url)
+        # ~110ms of import, paid on the first send rather than at cold start
+        import httpx
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(10, connect=3.05),
+            limits=httpx.Limits(max_connections=TELEGRAM_POOL_MAXSIZE, max_keepalive_connections=TELEGRAM_POOL_MAXSIZE),
+        )
+        self.global_bucket = TokenBucket(global_rate, GLOBAL_BURST)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.chat_buckets = {}
+        self.chat_locks = {}
+        self.deadline = None
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        if chat_id not in self.chat_buckets:
+            self.chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return self.chat_buckets[chat_id]
+
+    def _chat_lock(self, chat_id) -> asyncio.Lock:
+        if chat_id not in self.chat_locks:
+            self.chat_locks[chat_id] = asyncio.Lock()
+        return self.chat_locks[chat_id]
+
+    async def _call(self, method: str, chat_id, payload: dict) -> dict:
+        bucket = self._chat_bucket(chat_id)
+        async with self._chat_lock(chat_id):
+            for attempt in range(MAX_RETRIES + 1):
+                await bucket.acquire(self.deadline)
+                await self.global_bucket.acquire(self.deadline)
+                resp = await self.client.post(f"{self.base_url}/{method}", json=payload)
+                data = resp.json()
+                if data.get("error_code") != 429:
+                    return data
+                retry_after = data.get("parameters", {}).get("retry_after", 1)
+                if attempt == MAX_RETRIES:
+                    print(f"{method} to {chat_id} rate limited, giving up after {MAX_RETRIES} retries")
+                    break
+                bucket.block(retry_after)
+                self.global_bucket.block(retry_after)
+                if self.deadline is not None and time.monotonic() + retry_after > self.deadline:
+                    print(f"{method} to {chat_id} rate limited, retry after {retry_after}s passes the deadline")
+                    break
+                print(f"{method} to {chat_id} rate limited, retry after {retry_after}s ({attempt + 1}/{MAX_RETRIES})")
+            return data
+
+    async def send_message(self, chat_id, text, reply_id=None):
+        return await self._call("sendMessage", chat_id, {
+            'chat_id': chat_id,
+            'text': text,
+            "parse_mode": "html",
+            "reply_to_message_id": reply_id,
+        })
+
+    async def delete_message(self, chat_id, msg_id):
+        return await self._call("deleteMessage", chat_id, {
+            'chat_id': chat_id,
+            'message_id': msg_id,
+        })
+
+    async def send_messages(self, messages):
+        """Send [{"chat_id", "text", "reply_id"}, ...] concurrently across chats.
+
+        Responses come back in input order; messages to the same chat are
+        sent in input order.
+        """
+        return await asyncio.gather(*[
+            self.send_message(m["chat_id"], m["text"], m.get("reply_id")) for m in messages
+        ])
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class RateLimitedTelegram(Telegram):
+    """Blocking extension.Telegram whose calls go through an AsyncTelegram.
+
+    For sync callers such as core.queue: the event loop and the client
+    live as long as the object, so bucket state and 429 blocks carry over
+    between invocations of a warm container. Both are created on the
+    first send. `set_deadline` bounds the rate-limit waits of the calls
+    that follow, e.g. by the remaining time of a Lambda invocation.
+    """
+
+    def __init__(self, token: str, api_url: str = TELEGRAM_API_URL, **limits):
+        super().__init__(token, api_url=api_url)
+        self.api_url = api_url
+        self.limits = limits
+        self.loop = None
+        self.client = None
+        self.deadline = None
+
+    def set_deadline(self, seconds):
+        """Give up on rate-limit waits after `seconds` from now, None for no limit."""
+        self.deadline = None if seconds is None else time.monotonic() + seconds
+
+    def _run(self, call):
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.client = AsyncTelegram(self.token, api_url=self.api_url, **self.limits)
+        self.client.deadline = self.deadline
+        return self.loop.run_until_complete(call(self.client))
+
+    def send_message(self, chat_id, text, reply_id=None):
+        return self._run(lambda client: client.send_message(chat_id, text, reply_id))
+
+    def delete_message(self, chat_id, msg_id):
+        return self._run(lambda client: client.delete_message(chat_id, msg_id))
@@ -0,0 +1,278 @@
+"""Backfill channel history and replay it through the SQS handler.
+
+    python backfill.py fetch [--owner plus] [--out backfill] [--since 2025-01-01]
+    python backfill.py replay [--dir backfill] [--speed 60] [--real-telegram]
+
+fetch streams every ACTIVE signal_channels row's history (oldest first)
+with one concurrent iter_messages per channel and writes gzip JSONL shards,
+backfill/<chat_id>/<first msg_id>.jsonl.gz, one SQS message body per line
+(the shape the listeners send). A shard is written as .part and renamed
+once closed, then backfill/<chat_id>/checkpoint.json records its last
+msg_id, so a rerun resumes right after the last closed shard. A .part left
+by a killed run is discarded.
+
+replay merges the shards of all channels by msg_date and feeds them to
+core.queue.handler in SQS-style batches, sleeping the original gaps divided
+by --speed (0 = no sleeping). It refuses to run unless AWS_ENDPOINT_URL
+points boto3 at local stand-ins (LocalStack / DynamoDB Local), because the
+handler writes orders and invokes the trading lambdas. The handler's Bot
+API calls go to the local stand-in of telegram_standin.py unless
+TELEGRAM_API_URL already points at a local one; only --real-telegram lets
+a replay post to api.telegram.org.
+"""
+import argparse
+import asyncio
+import contextlib
+import glob
+import gzip
+import heapq
+import io
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+DEFAULT_DIR = "backfill"
+SHARD_SIZE = 5000
+FETCH_CONCURRENCY = 4
+REPLAY_BATCH_SIZE = 5
+# Messages closer than this (after --speed) arrive in the same SQS batch
+REPLAY_BATCH_WINDOW = 0.1
+REPLAY_MAX_SLEEP = 10
+
+
+def active_channels(owner=None):
+    """ACTIVE signal_channels rows, optionally of one owner."""
+    from storage import get_storage
+    from channel_registry import ChannelRegistry
+    if owner:
+        return list(ChannelRegistry(owner).load().channels.values())
+    return get_storage().channels.active()
+
+
+# ---------------------------------------------------------------- fetch ---
+
+def read_checkpoint(channel_dir):
+    try:
+        with open(os.path.join(channel_dir, "checkpoint.json")) as f:
+            return json.load(f)["last_msg_id"]
+    except FileNotFoundError:
+        return 0
+
+
+def write_checkpoint(channel_dir, last_msg_id):
+    path = os.path.join(channel_dir, "checkpoint.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump({"last_msg_id": last_msg_id, "updated_at": datetime.now(timezone.utc).isoformat()}, f)
+    os.replace(path + ".tmp", path)
+
+
+class ShardWriter:
+    """Rolls gzip JSONL shards of `shard_size` lines and checkpoints each one."""
+
+    def __init__(self, channel_dir, shard_size):
+        self.channel_dir = channel_dir
+        self.shard_size = shard_size
+        self.file = None
+        self.path = None
+        self.lines = 0
+        self.last_msg_id = None
+
+    def write(self, body):
+        if self.file is None:
+            self.path = os.path.join(self.channel_dir, f"{body['msg_id']:012d}.jsonl.gz")
+            self.file = gzip.open(self.path + ".part", "wt", encoding="utf-8")
+            self.lines = 0
+        self.file.write(json.dumps(body, ensure_ascii=False) + "\n")
+        self.lines += 1
+        self.last_msg_id = body["msg_id"]
+        if self.lines >= self.shard_size:
+            self.close()
+
+    def close(self):
+        if self.file is None:
+            return
+        self.file.close()
+        os.replace(self.path + ".part", self.path)
+        write_checkpoint(self.channel_dir, self.last_msg_id)
+        self.file = None
+
+
+async def fetch_channel(client, channel, out_dir, since, shard_size, semaphore):
+    chat_id = int(channel["chat_id"])
+    channel_dir = os.path.join(out_dir, str(chat_id))
+    os.makedirs(channel_dir, exist_ok=True)
+    # Leftovers of an interrupted run; the checkpoint predates them
+    for part in glob.glob(os.path.join(channel_dir, "*.part")):
+        os.remove(part)
+    min_id = read_checkpoint(channel_dir)
+
+    async with semaphore:
+        print(f"{chat_id}: fetching after msg_id {min_id}")
+        writer = ShardWriter(channel_dir, shard_size)
+        count = 0
+        started = time.monotonic()
+        try:
+            async for message in client.iter_messages(chat_id, reverse=True, min_id=min_id, offset_date=since):
+                if not message.message:
+                    continue
+                writer.write({
+                    "chat_id": chat_id,
+                    "msg_id": message.id,
+                    "msg_date": message.date.isoformat(),
+                    "msg_text": message.message,
+                    "reply_msg_id": message.reply_to.reply_to_msg_id if message.reply_to else None,
+                    "msg_type": "NEW",
+                    "signal_type": channel.get("signal_type"),
+                })
+                count += 1
+        finally:
+            writer.close()
+        elapsed = time.monotonic() - started
+        print(f"{chat_id}: {count} messages in {elapsed:.1f}s, last msg_id {writer.last_msg_id or min_id}")
+        return count
+
+
+async def fetch(args):
+    from telethon import TelegramClient
+    load_dotenv()
+    channels = active_channels(args.owner)
+    since = datetime.fromisoformat(args.since).replace(tzinfo=timezone.utc) if args.since else None
+    print(f"Backfilling {len(channels)} channels into {args.out}")
+
+    client = TelegramClient(os.getenv("TG_SESSION_NAME"), int(os.getenv("TG_API_ID")), os.getenv("TG_API_HASH"))
+    await client.start()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    try:
+        counts = await asyncio.gather(*[
+            fetch_channel(client, channel, args.out, since, args.shard_size, semaphore) for channel in channels
+        ], return_exceptions=True)
+    finally:
+        await client.disconnect()
+    for channel, count in zip(channels, counts):
+        if isinstance(count, Exception):
+            print(f"{channel['chat_id']}: failed, rerun to resume: {count}")
+    print(f"Fetched {sum(c for c in counts if isinstance(c, int))} messages")
+
+
+# --------------------------------------------------------------- replay ---
+
+def read_shards(channel_dir):
+    for path in sorted(glob.glob(os.path.join(channel_dir, "*.jsonl.gz"))):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def merged_messages(backfill_dir, chat_ids=None):
+    """All channels' messages merged into one stream ordered by msg_date."""
+    streams = []
+    for channel_dir in sorted(glob.glob(os.path.join(backfill_dir, "*"))):
+        if not os.path.isdir(channel_dir):
+            continue
+        if chat_ids and int(os.path.basename(channel_dir)) not in chat_ids:
+            continue
+        streams.append(read_shards(channel_dir))
+    return heapq.merge(*streams, key=lambda m: m["msg_date"])
+
+
+def sqs_batches(messages, speed, batch_size):
+    """Yield (sleep seconds, SQS records) the way the queue would hand them out."""
+    batch = []
+    batch_sleep = 0.0
+    previous = None
+    for n, message in enumerate(messages):
+        at = datetime.fromisoformat(message["msg_date"])
+        gap = (at - previous).total_seconds() / speed if previous and speed else 0.0
+        previous = at
+        if batch and (len(batch) >= batch_size or gap > REPLAY_BATCH_WINDOW):
+            yield batch_sleep, batch
+            batch, batch_sleep = [], gap
+        elif not batch:
+            batch_sleep = gap
+        batch.append({
+            "messageId": f"replay-{n}",
+            "body": json.dumps(message),
+            "attributes": {"MessageGroupId": f"queue-{message['chat_id']}"},
+        })
+    if batch:
+        yield batch_sleep, batch
+
+
+def replay(args):
+    if not os.getenv("AWS_ENDPOINT_URL") and not args.allow_remote:
+        sys.exit("Set AWS_ENDPOINT_URL to local stand-ins (or pass --allow-remote): "
+                 "the handler writes orders and invokes the trading lambdas.")
+    # Imported late so AWS_ENDPOINT_URL is checked before any client exists
+    from core import queue
+    from extension import Telegram, TELEGRAM_API_URL, TG_SIGNAL_BOT_TOKEN
+    from telegram_standin import is_local, start_server
+    if args.real_telegram:
+        print(f"Posting to the real Bot API at {TELEGRAM_API_URL}")
+    elif not is_local(TELEGRAM_API_URL):
+        # Months of history must not land in the production channels
+        _, api_url = start_server()
+        queue.telegram_bot = Telegram(TG_SIGNAL_BOT_TOKEN, api_url=api_url)
+        print(f"Bot API stand-in at {api_url}")
+
+    latencies = []
+    failed = 0
+    total = 0
+    started = time.monotonic()
+    for sleep, records in sqs_batches(merged_messages(args.dir, args.chat_ids), args.speed, args.batch_size):
+        if sleep > 0:
+            time.sleep(min(sleep, args.max_sleep))
+        t = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()) if args.quiet else contextlib.nullcontext():
+            resp = queue.handler({"Records": records}, None)
+        latencies.append(time.perf_counter() - t)
+        failed += len(resp.get("batchItemFailures", []))
+        total += len(records)
+        if len(latencies) % 100 == 0:
+            print(f"{total} messages, {failed} failed, {time.monotonic() - started:.0f}s")
+
+    elapsed = time.monotonic() - started
+    if not latencies:
+        print("Nothing to replay")
+        return
+    latencies.sort()
+    print(f"Replayed {total} messages in {len(latencies)} batches over {elapsed:.1f}s "
+          f"({total / elapsed:.0f} msgs/s), {failed} failed")
+    print(f"handler latency per batch: p50 {statistics.median(latencies) * 1000:.1f}ms, "
+          f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.1f}ms")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Channel history backfill and replay")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    f = sub.add_parser("fetch", help="download channel history into gzip JSONL shards")
+    f.add_argument("--owner", default=None, help="only this owner's channels")
+    f.add_argument("--out", default=DEFAULT_DIR)
+    f.add_argument("--since", default=None, help="ISO date, only messages after it")
+    f.add_argument("--shard-size", dest="shard_size", type=int, default=SHARD_SIZE)
+    f.add_argument("--concurrency", type=int, default=FETCH_CONCURRENCY)
+
+    r = sub.add_parser("replay", help="feed shards through core.queue.handler")
+    r.add_argument("--dir", default=DEFAULT_DIR)
+    r.add_argument("--chat-ids", dest="chat_ids", type=int, nargs="*", default=None)
+    r.add_argument("--speed", type=float, default=60, help="time multiplier, 0 = as fast as possible")
+    r.add_argument("--batch-size", dest="batch_size", type=int, default=REPLAY_BATCH_SIZE)
+    r.add_argument("--max-sleep", dest="max_sleep", type=float, default=REPLAY_MAX_SLEEP)
+    r.add_argument("--real-telegram", dest="real_telegram", action="store_true",
+                   help="post to TELEGRAM_API_URL even when it is not local")
+    r.add_argument("--allow-remote", dest="allow_remote", action="store_true")
+    r.add_argument("--quiet", action="store_true", help="hide the handler's own output")
+    return p.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "fetch":
+        asyncio.run(fetch(args))
+    else:
+        replay(args)
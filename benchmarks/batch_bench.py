@@ -0,0 +1,43 @@
+"""Throughput of ForexSignalProcessor.process_batch in-process vs a worker pool.
+
+    python benchmarks/batch_bench.py [--messages 50000] [--workers N]
+
+The corpus is repeated until --messages messages, roughly the size of a
+month's backfill for a busy channel. The pool only pays off with more than
+one core (os.cpu_count() is printed).
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+from classifiers import ForexSignalProcessor
+
+
+def main():
+    p = argparse.ArgumentParser(description="Batch classification benchmark")
+    p.add_argument("--messages", type=int, default=50000)
+    p.add_argument("--workers", type=int, default=None)
+    p.add_argument("--version", default=corpus.DEFAULT_VERSION)
+    args = p.parse_args()
+
+    recorded = [m for msgs in corpus.load(args.version).values() for m in msgs]
+    messages = list(itertools.islice(itertools.cycle(recorded), args.messages))
+    processor = ForexSignalProcessor()
+
+    print(f"{len(messages)} messages, {os.cpu_count()} cpus")
+    timings = {}
+    for name, workers in (("in-process", 1), ("process pool", args.workers)):
+        start = time.perf_counter()
+        results = processor.process_batch(messages, workers=workers, min_parallel=0)
+        timings[name] = time.perf_counter() - start
+        print(f"{name:<14}{timings[name]:>8.2f}s{len(messages) / timings[name]:>12.0f} msgs/s")
+    assert len(results) == len(messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Websocket broadcast fanout, sequential vs concurrent posts.
+
+    python benchmarks/broadcast_bench.py [--subscribers 300] [--post-ms 20] [--gone 0.05] [--burst 2]
+                                         [--signals 5] [--invoke-ms 25] [--start-ms 40]
+
+Registers --subscribers connections of one channel through connect_handler
+on the SQLite backend (in memory) and broadcasts one signal to them with an
+API Gateway stand-in that takes --post-ms per post_to_connection and
+reports --gone of the connections as gone. Compares the old loop (one
+post at a time, payload serialised per connection) with
+core.websocket.post_to_connections.
+
+Then sends --burst signals in a row through broadcast_message (NEW_SIGNAL
+followed by CANCELLED and so on), once with the subscriber cache emptied
+before every signal, the way each invocation used to query
+websocket_connections, and once warm, counting subscriber queries and
+version reads.
+
+Last, a batch of --signals signals goes through each core.broadcast mode.
+The Lambda stand-in takes --invoke-ms per async invoke call and the
+broadcastMessageHandler it starts is run right after the batch, counted as
+starting --start-ms after its invoke (a warm start; cold starts add
+hundreds of ms more). Reported: time spent in TgMsgHandler, Lambda
+invocations added, and signal-to-websocket latency from the broadcast
+decision to the last post.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["STORAGE_SQLITE_PATH"] = ":memory:"
+
+import extension
+from core import broadcast, websocket
+
+CHANNEL_ID = "-1001297727353"
+MESSAGE = {"action": "NEW_SIGNAL", "chat_id": int(CHANNEL_ID), "pair": "XAUUSD", "side": "BUY",
+           "entry": 2331.5, "stop_loss": 2325.0, "take_profit": [2335.0, 2340.0], "order_id": "x_1"}
+
+
+class GoneException(Exception):
+    pass
+
+
+class ApiGatewayStandIn:
+    """post_to_connection with a fixed round-trip time and some gone connections."""
+
+    class exceptions:
+        GoneException = GoneException
+
+    def __init__(self, post_seconds, gone):
+        self.post_seconds = post_seconds
+        self.gone = gone
+        self.posts = 0
+        self.lock = threading.Lock()
+
+    def post_to_connection(self, ConnectionId, Data):
+        time.sleep(self.post_seconds)
+        with self.lock:
+            self.posts += 1
+        if ConnectionId in self.gone:
+            raise GoneException(ConnectionId)
+
+
+def connect_all(n):
+    for i in range(n):
+        websocket.connect_handler({
+            "queryStringParameters": {"token": "TOKEN", "channel_id": CHANNEL_ID},
+            "requestContext": {"connectionId": f"conn-{i}", "requestTimeEpoch": i},
+        }, None)
+
+
+def sequential(message):
+    # The loop send_message_to_connections used to run
+    apigw_client = extension.get_apigw_client()
+    for connection in websocket.get_storage().connections.for_channel(CHANNEL_ID):
+        connection_id = connection["connection_id"]
+        try:
+            apigw_client.post_to_connection(ConnectionId=connection_id, Data=json.dumps({"message": message}).encode("utf-8"))
+        except Exception:
+            # Printed and otherwise ignored, gone connections stayed in the table
+            pass
+
+
+def run(name, fn, api, subscribers):
+    connect_all(subscribers)
+    api.posts = 0
+    start = time.perf_counter()
+    fn(MESSAGE)
+    elapsed = time.perf_counter() - start
+    left = len(websocket.get_storage().connections.for_channel(CHANNEL_ID))
+    print(f"{name:<12}{elapsed * 1000:>10.0f}{api.posts:>8}{left:>12}")
+
+
+class CountingConnections:
+    """ConnectionStore proxy counting subscriber queries and version reads."""
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = 0
+        self.version_reads = 0
+
+    def for_channel(self, channel_id):
+        self.queries += 1
+        return self.store.for_channel(channel_id)
+
+    def active(self):
+        self.queries += 1
+        return self.store.active()
+
+    def version(self):
+        self.version_reads += 1
+        return self.store.version()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+def burst(name, signals, cold):
+    storage = websocket.get_storage()
+    counting = storage.connections = CountingConnections(storage.connections)
+    websocket.subscribers_cache = websocket.TTLCache(websocket.SUBSCRIBERS_CACHE_SIZE, websocket.SUBSCRIBERS_CACHE_TTL)
+    # A warm container has seen the connections version long before the burst
+    settle, websocket.SUBSCRIBERS_SETTLE = websocket.SUBSCRIBERS_SETTLE, 0
+    actions = ["NEW_SIGNAL", "CANCELLED"]
+    start = time.perf_counter()
+    for i in range(signals):
+        if cold:
+            websocket.subscribers_cache.items.clear()
+        websocket.broadcast_message({"body": {"message": {**MESSAGE, "action": actions[i % 2]}}}, None)
+    elapsed = time.perf_counter() - start
+    websocket.SUBSCRIBERS_SETTLE = settle
+    storage.connections = counting.store
+    print(f"{name:<12}{elapsed * 1000:>10.0f}{counting.queries:>10}{counting.version_reads:>10}")
+
+
+class LambdaStandIn:
+    """Async invoke with a fixed API call time; payloads are kept to be run later."""
+
+    def __init__(self, invoke_seconds):
+        self.invoke_seconds = invoke_seconds
+        self.invoked = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        time.sleep(self.invoke_seconds)
+        self.invoked.append((time.perf_counter(), json.loads(Payload)))
+
+
+def compare_mode(mode, signals, lambda_client, start_seconds):
+    lambda_client.invoked = []
+    added = {}
+    delivered = {}
+    send = websocket.broadcast
+
+    def timed_broadcast(message, sent_at=None):
+        result = send(message, sent_at)
+        delivered[message["seq"]] = time.perf_counter()
+        return result
+
+    websocket.broadcast = timed_broadcast
+    try:
+        started = time.perf_counter()
+        broadcasts = broadcast.Broadcasts(mode)
+        for seq in range(signals):
+            added[seq] = time.perf_counter()
+            broadcasts.add({**MESSAGE, "seq": seq})
+        broadcasts.flush()
+        in_handler = time.perf_counter() - started
+        # broadcastMessageHandler runs: shift its posts to start_seconds after the invoke
+        for invoked_at, payload in lambda_client.invoked:
+            ran_at = time.perf_counter()
+            before = dict(delivered)
+            websocket.broadcast_message(payload, None)
+            for seq in delivered.keys() - before.keys():
+                delivered[seq] += invoked_at + start_seconds - ran_at
+    finally:
+        websocket.broadcast = send
+    latencies = [delivered[seq] - added[seq] for seq in added]
+    print(f"{mode:<12}{in_handler * 1000:>12.0f}{len(lambda_client.invoked):>10}"
+          f"{statistics.median(latencies) * 1000:>10.0f}{max(latencies) * 1000:>10.0f}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Websocket broadcast fanout benchmark")
+    p.add_argument("--subscribers", type=int, default=300)
+    p.add_argument("--post-ms", dest="post_ms", type=float, default=20, help="post_to_connection round trip")
+    p.add_argument("--gone", type=float, default=0.05, help="fraction of connections that are gone")
+    p.add_argument("--burst", type=int, default=2, help="signals broadcast back to back")
+    p.add_argument("--signals", type=int, default=5, help="broadcast signals in one SQS batch")
+    p.add_argument("--invoke-ms", dest="invoke_ms", type=float, default=25, help="async lambda invoke call")
+    p.add_argument("--start-ms", dest="start_ms", type=float, default=40, help="invoke to handler start")
+    args = p.parse_args()
+
+    gone = set(random.sample([f"conn-{i}" for i in range(args.subscribers)], int(args.subscribers * args.gone)))
+    api = ApiGatewayStandIn(args.post_ms / 1000, gone)
+    extension._clients["apigatewaymanagementapi"] = api
+
+    print(f"{args.subscribers} subscribers, {args.post_ms:g}ms per post, {len(gone)} gone, "
+          f"{websocket.BROADCAST_CONCURRENCY} concurrent")
+    print(f"{'':<12}{'ms':>10}{'posts':>8}{'remaining':>12}")
+    run("sequential", sequential, api, args.subscribers)
+    run("concurrent", lambda m: websocket.send_message_to_connections(CHANNEL_ID, m), api, args.subscribers)
+
+    # Gone connections were removed above, the burst only sees live ones
+    print(f"\n{args.burst} signals back to back")
+    print(f"{'':<12}{'ms':>10}{'queries':>10}{'versions':>10}")
+    burst("uncached", args.burst, cold=True)
+    burst("cached", args.burst, cold=False)
+
+    lambda_client = extension._clients["lambda"] = LambdaStandIn(args.invoke_ms / 1000)
+    print(f"\n{args.signals} signals in one batch, {args.invoke_ms:g}ms per invoke, handler starts {args.start_ms:g}ms later")
+    print(f"{'mode':<12}{'handler ms':>12}{'invokes':>10}{'p50 ms':>10}{'max ms':>10}")
+    for mode in broadcast.MODES:
+        compare_mode(mode, args.signals, lambda_client, args.start_ms / 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Cost of finding a channel's websocket subscribers.
+
+    python benchmarks/fanout_bench.py --moto [--connections 10000] [--channels 200]
+    AWS_ENDPOINT_URL=http://localhost:8000 python benchmarks/fanout_bench.py
+
+Fills websocket_connections (create_tables.py definition) with
+--connections connections spread over --channels channels, then looks up
+the subscribers of random channels two ways:
+
+  status index   every status = 1 connection, filtered in Python (the old
+                 send_message_to_connections)
+  channel index  channel_id-status-index, only that channel's rows
+
+and reports per lookup the latency, DynamoDB round trips and items read.
+--page-size caps items per query page to exercise LastEvaluatedKey the
+way the 1MB page limit does on a real table. --moto runs against moto's
+in-process DynamoDB (pip install moto), otherwise AWS_ENDPOINT_URL must
+point at DynamoDB Local or LocalStack.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from create_tables import create_tables
+from storage.dynamodb import BATCH_WRITE_MAX_ITEMS, DynamoConnectionStore, dumps
+
+
+class CountingClient:
+    """DynamoDB client proxy that counts query round trips and items read."""
+
+    def __init__(self, client, page_size=None):
+        self.client = client
+        self.page_size = page_size
+        self.calls = 0
+        self.items_read = 0
+
+    def query(self, **kwargs):
+        if self.page_size:
+            kwargs["Limit"] = self.page_size
+        resp = self.client.query(**kwargs)
+        self.calls += 1
+        self.items_read += resp["ScannedCount"]
+        return resp
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def fill(client, connections, channels):
+    requests = [{"PutRequest": {"Item": dumps({
+        "connection_id": f"conn-{i}",
+        "status": 1,
+        "channel_id": str(-1000000000000 - i % channels),
+        "connected_at": 1700000000000 + i,
+    })}} for i in range(connections)]
+    for i in range(0, len(requests), BATCH_WRITE_MAX_ITEMS):
+        pending = {"websocket_connections": requests[i:i + BATCH_WRITE_MAX_ITEMS]}
+        while pending:
+            pending = client.batch_write_item(RequestItems=pending).get("UnprocessedItems") or {}
+
+
+def measure(lookup, counting, channel_ids):
+    latencies = []
+    counting.calls = counting.items_read = 0
+    results = {}
+    for channel_id in channel_ids:
+        start = time.perf_counter()
+        results[channel_id] = sorted(c["connection_id"] for c in lookup(channel_id))
+        latencies.append(time.perf_counter() - start)
+    n = len(channel_ids)
+    return results, {
+        "ms": statistics.median(latencies) * 1000,
+        "calls": counting.calls / n,
+        "items_read": counting.items_read / n,
+        "subscribers": statistics.mean(len(r) for r in results.values()),
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description="Websocket subscriber lookup benchmark")
+    p.add_argument("--connections", type=int, default=10000)
+    p.add_argument("--channels", type=int, default=200)
+    p.add_argument("--lookups", type=int, default=20)
+    p.add_argument("--page-size", dest="page_size", type=int, default=None, help="Limit per query page")
+    p.add_argument("--moto", action="store_true", help="use moto's in-process DynamoDB")
+    args = p.parse_args()
+
+    os.environ.setdefault("MY_AWS_REGION", "ap-northeast-2")
+    if args.moto:
+        from moto import mock_aws
+        mock_aws().start()
+    elif not os.getenv("AWS_ENDPOINT_URL"):
+        sys.exit("Pass --moto or point AWS_ENDPOINT_URL at DynamoDB Local / LocalStack")
+    from extension import get_dynamodb
+
+    client = get_dynamodb()
+    create_tables(client, ["websocket_connections"])
+    started = time.perf_counter()
+    fill(client, args.connections, args.channels)
+    print(f"{args.connections} connections over {args.channels} channels written in {time.perf_counter() - started:.1f}s")
+
+    counting = CountingClient(client, args.page_size)
+    store = DynamoConnectionStore(counting)
+    channel_ids = [str(-1000000000000 - random.randrange(args.channels)) for _ in range(args.lookups)]
+
+    # What send_message_to_connections did before channel_id-status-index
+    old, old_stats = measure(lambda channel_id: [
+        c for c in store.active() if c.get("channel_id") == channel_id
+    ], counting, channel_ids)
+    new, new_stats = measure(store.for_channel, counting, channel_ids)
+    assert old == new, "the two paths disagree"
+
+    print(f"{'per lookup':<16}{'ms':>10}{'queries':>10}{'items read':>12}{'subscribers':>13}")
+    for name, s in (("status index", old_stats), ("channel index", new_stats)):
+        print(f"{name:<16}{s['ms']:>10.1f}{s['calls']:>10.1f}{s['items_read']:>12.0f}{s['subscribers']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Per-message classification time over the recorded corpus.
+
+    python benchmarks/regex_bench.py [--rounds 200] [--cold-re-cache]
+
+--cold-re-cache calls re.purge() before every message, which is what inline
+re.search/re.compile calls pay whenever the re module cache is cold (new
+Lambda container) or thrashed. Patterns from classifiers.patterns are
+compiled once at import and are unaffected by it.
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+from classifiers import ForexSignalProcessor
+
+
+def bench_channel(processor, messages, rounds, cold_re_cache):
+    timings = []
+    for _ in range(rounds):
+        for message in messages:
+            if cold_re_cache:
+                re.purge()
+            start = time.perf_counter()
+            processor.process_message(message)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    p = argparse.ArgumentParser(description="Classifier regex micro-benchmark")
+    p.add_argument("--rounds", type=int, default=200)
+    p.add_argument("--version", default=corpus.DEFAULT_VERSION)
+    p.add_argument("--cold-re-cache", action="store_true")
+    args = p.parse_args()
+
+    processor = ForexSignalProcessor()
+    messages = corpus.load(args.version)
+
+    total = []
+    print(f"{'channel':<20}{'msgs':>6}{'mean us/msg':>14}")
+    for channel, msgs in messages.items():
+        timings = bench_channel(processor, msgs, args.rounds, args.cold_re_cache)
+        total += timings
+        print(f"{channel:<20}{len(msgs):>6}{sum(timings) / len(timings) * 1e6:>14.1f}")
+    print(f"{'all':<20}{len(total) // args.rounds:>6}{sum(total) / len(total) * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
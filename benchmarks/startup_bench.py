@@ -0,0 +1,104 @@
+"""Cold-start cost of the Lambda handler modules.
+
+    python benchmarks/startup_bench.py [--runs 10] [--top 8]
+
+Each run is a fresh interpreter, like a Lambda cold start. For core.queue
+(TgMsgHandler) and core.websocket it reports:
+
+  import     `-X importtime` cumulative time of the handler module
+  first use  import plus what the first invocation sets up: the boto3
+             clients it calls and, for core.queue, the rate-limited Bot API
+             client (httpx and its event loop) and the classifier of one
+             routed message
+  eager      import plus everything extension and classifiers used to
+             build at import: all clients, the requests session, every
+             classifier
+
+Medians over --runs, then the handler module's heaviest direct imports. No AWS
+calls are made: clients are only constructed.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What the old module-level code built on import: four clients, the
+# requests session, every classifier and the process pool machinery
+EAGER = ("import extension, concurrent.futures.process; [f() for f in extension._LAZY_CLIENTS.values()]; "
+         "extension.get_http_session()")
+
+TARGETS = {
+    "core.queue": {
+        "first use": "import asyncio, extension; extension.get_dynamodb(); extension.get_lambda_client(); "
+                     "core.queue.telegram_bot._run(lambda client: asyncio.sleep(0)); "
+                     "core.queue.processor.classifier('wolf_forex')",
+        "eager": EAGER + "; import classifiers; [core.queue.processor.classifier(n) for n in classifiers.CLASSIFIERS]",
+    },
+    "core.websocket": {
+        "first use": "import extension; extension.get_dynamodb(); extension.get_apigw_client()",
+        "eager": EAGER,
+    },
+}
+
+IMPORTTIME = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def run(code, importtime=False):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("MY_AWS_REGION", "ap-northeast-2")
+    cmd = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return proc.stdout, proc.stderr
+
+
+def timed(module, setup=""):
+    code = (
+        "import time; t = time.perf_counter()\n"
+        f"import {module}\n{setup}\n"
+        "print(time.perf_counter() - t)"
+    )
+    return float(run(code)[0].strip().splitlines()[-1])
+
+
+def import_profile(module):
+    """(cumulative us of `module`, [(cumulative us, name)] of its direct imports)."""
+    children = []
+    for line in run(f"import {module}", importtime=True)[1].splitlines():
+        m = IMPORTTIME.match(line)
+        if not m:
+            continue
+        depth, name = len(m.group(3)) // 2, m.group(4)
+        # -X importtime lists a module's imports right before the module
+        if depth == 1:
+            children.append((int(m.group(2)), name))
+        elif depth == 0:
+            if name == module:
+                return int(m.group(2)), children
+            children = []
+    raise RuntimeError(f"{module} not in the -X importtime output")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Handler cold-start benchmark")
+    p.add_argument("--runs", type=int, default=10)
+    p.add_argument("--top", type=int, default=8, help="heaviest imports to list")
+    args = p.parse_args()
+
+    for module, setups in TARGETS.items():
+        imports = [import_profile(module)[0] / 1000 for _ in range(args.runs)]
+        first = [timed(module, setups["first use"]) * 1000 for _ in range(args.runs)]
+        eager = [timed(module, setups["eager"]) * 1000 for _ in range(args.runs)]
+        print(f"{module}")
+        print(f"  import     {statistics.median(imports):8.1f} ms")
+        print(f"  first use  {statistics.median(first):8.1f} ms")
+        print(f"  eager      {statistics.median(eager):8.1f} ms")
+        for cumulative, name in sorted(import_profile(module)[1], reverse=True)[:args.top]:
+            print(f"    {cumulative / 1000:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
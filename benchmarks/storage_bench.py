@@ -0,0 +1,138 @@
+"""Storage layer benchmark: dynamodb_json cost and the SQS handler on SQLite.
+
+    python benchmarks/storage_bench.py [--rounds 20] [--batch-size 10]
+
+First times the dynamodb_json conversions on an order row: json_util,
+boto3's TypeSerializer/TypeDeserializer and storage/dynamodb.py's own
+dumps/loads, which every DynamoDB call goes through, with plain json.dumps
+as the floor. Then replays the corpus through core.queue.handler with
+STORAGE_BACKEND=sqlite in memory, with the Bot API and lambda invokes
+stubbed, so the whole pipeline runs without AWS. Each round shifts msg_ids
+so orders are new every time.
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+from decimal import Decimal
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["STORAGE_BACKEND"] = "sqlite"
+os.environ["STORAGE_SQLITE_PATH"] = ":memory:"
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from dynamodb_json import json_util
+
+import corpus
+from storage import dynamodb as ddb
+
+SAMPLE_ORDER = {
+    "order_id": "-1001485605405_48210", "status": "PENDING", "chat_id": -1001485605405,
+    "pair": "XAUUSD", "side": "BUY", "type": "LIMIT", "entry": 2331.5, "stop_loss": 2325.0,
+    "take_profit": [2335.0, 2340.0, 2350.0], "leverage": None, "pnl": 0,
+    "created_at": "2025-06-02T08:15:03+00:00", "updated_at": "",
+    "extracted": {"action": "NEW_SIGNAL", "pair": "XAUUSD", "side": "BUY", "entry": 2331.5,
+                  "stop_loss": 2325.0, "take_profit": [2335.0, 2340.0, 2350.0], "type": "LIMIT"},
+}
+
+
+def per_call_us(fn, arg, n):
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(n):
+            fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best / n * 1e6
+
+
+def to_decimal(value):
+    # TypeSerializer refuses floats
+    if isinstance(value, float):
+        return Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: to_decimal(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [to_decimal(v) for v in value]
+    return value
+
+
+def serialisation(n):
+    serializer, deserializer = TypeSerializer(), TypeDeserializer()
+    typed = json_util.dumps(SAMPLE_ORDER, True)
+    rows = [
+        ("json.dumps (floor)", json.dumps, SAMPLE_ORDER),
+        ("json_util.dumps", lambda x: json_util.dumps(x, True), SAMPLE_ORDER),
+        ("TypeSerializer", lambda x: {k: serializer.serialize(v) for k, v in to_decimal(x).items()}, SAMPLE_ORDER),
+        ("storage dumps", ddb.dumps, SAMPLE_ORDER),
+        ("json_util.loads", lambda x: json_util.loads(x, True), typed),
+        ("TypeDeserializer", lambda x: {k: deserializer.deserialize(v) for k, v in x.items()}, typed),
+        ("storage loads", ddb.loads, typed),
+    ]
+    print(f"{'order row':<22}{'us/call':>10}")
+    for name, fn, arg in rows:
+        print(f"{name:<22}{per_call_us(fn, arg, n):>10.1f}")
+
+
+def shifted(message, offset):
+    message = dict(message, msg_id=message["msg_id"] + offset)
+    if message.get("reply_msg_id"):
+        message["reply_msg_id"] += offset
+    return message
+
+
+def pipeline(rounds, batch_size):
+    import core.queue as queue
+    import extension
+    ids = itertools.count(1)
+    queue.telegram_bot.send_message = lambda chat_id, text, reply_id=None: {"ok": True, "result": {"message_id": next(ids)}}
+
+    class NoLambda:
+        def invoke(self, **kwargs):
+            pass
+    extension._clients["lambda"] = NoLambda()
+
+    messages = [m for msgs in corpus.load().values() for m in msgs]
+    latencies = []
+    total = 0
+    started = time.perf_counter()
+    for r in range(rounds):
+        batch = [shifted(m, r * 10_000_000) for m in messages]
+        for i in range(0, len(batch), batch_size):
+            records = [{
+                "messageId": f"{r}-{i + n}",
+                "body": json.dumps(m),
+                "attributes": {"MessageGroupId": f"queue-{m['chat_id']}"},
+            } for n, m in enumerate(batch[i:i + batch_size])]
+            t = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                resp = queue.handler({"Records": records}, None)
+            latencies.append(time.perf_counter() - t)
+            total += len(records)
+            if resp["batchItemFailures"]:
+                print(f"failures: {resp['batchItemFailures']}")
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    orders = len(queue.get_storage().db.tables["orders"].query())
+    print(f"\nhandler on sqlite: {total} messages in {elapsed:.2f}s ({total / elapsed:.0f} msgs/s), {orders} orders")
+    print(f"per batch of {batch_size}: p50 {statistics.median(latencies) * 1000:.2f}ms, "
+          f"p99 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000:.2f}ms")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Storage layer benchmark")
+    p.add_argument("--calls", type=int, default=2000, help="calls per serialisation timing")
+    p.add_argument("--rounds", type=int, default=20, help="corpus replays through the handler")
+    p.add_argument("--batch-size", dest="batch_size", type=int, default=10)
+    args = p.parse_args()
+    serialisation(args.calls)
+    pipeline(args.rounds, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Classifier benchmark suite over the recorded message corpus.
+
+    python benchmarks/suite.py [--rounds 200] [--repeat 5] [--version v2]
+    python benchmarks/suite.py --save       # record benchmarks/baselines/<version>.json
+    python benchmarks/suite.py --compare    # diff against that baseline
+
+Every corpus message (NEW, EDITED and DELETED events) goes through
+ForexSignalProcessor.process_message, grouped by the classifier its chat_id
+routes to. Per classifier it reports p50/p99 latency, throughput and the
+mean tracemalloc peak per message. Timings are the best of --repeat runs
+and the allocation pass runs separately so tracing doesn't skew them. --compare exits 1 when p50, p99 or
+allocations regress by more than --threshold percent.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+from classifiers import ForexSignalProcessor
+
+BASELINES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+COMPARED = ("p50_us", "p99_us", "alloc_bytes")
+
+
+def group_by_classifier(processor, messages):
+    names = processor.route_names()
+    groups = defaultdict(list)
+    for msgs in messages.values():
+        for message in msgs:
+            groups[names.get(message["chat_id"], "unrouted")].append(message)
+    return dict(sorted(groups.items()))
+
+
+def percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def time_rounds(processor, messages, rounds):
+    timings = []
+    for _ in range(rounds):
+        for message in messages:
+            start = time.perf_counter()
+            processor.process_message(message)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings
+
+
+def bench(processor, messages, rounds, repeat):
+    # Best of `repeat` runs, like timeit: noise only ever adds time
+    runs = [time_rounds(processor, messages, rounds) for _ in range(repeat)]
+
+    tracemalloc.start()
+    peaks = []
+    for message in messages:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        processor.process_message(message)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "messages": len(messages),
+        "p50_us": round(min(percentile(t, 0.50) for t in runs) * 1e6, 2),
+        "p99_us": round(min(percentile(t, 0.99) for t in runs) * 1e6, 2),
+        "msgs_per_s": round(max(len(t) / sum(t) for t in runs)),
+        "alloc_bytes": round(statistics.mean(peaks)),
+    }
+
+
+def run(version, rounds, repeat):
+    processor = ForexSignalProcessor()
+    groups = group_by_classifier(processor, corpus.load(version))
+    # One untimed pass to warm caches and lazy state
+    for messages in groups.values():
+        for message in messages:
+            processor.process_message(message)
+    return {name: bench(processor, messages, rounds, repeat) for name, messages in groups.items()}
+
+
+def print_results(results, baseline=None):
+    print(f"{'classifier':<18}{'msgs':>6}{'p50 us':>10}{'p99 us':>10}{'msgs/s':>10}{'alloc B':>10}")
+    for name, r in results.items():
+        print(f"{name:<18}{r['messages']:>6}{r['p50_us']:>10.1f}{r['p99_us']:>10.1f}{r['msgs_per_s']:>10}{r['alloc_bytes']:>10}")
+        if baseline and name in baseline:
+            deltas = [
+                f"{change(baseline[name][k], r[k]):+.0f}%" if baseline[name][k] else "n/a"
+                for k in ("p50_us", "p99_us", "msgs_per_s", "alloc_bytes")
+            ]
+            print(f"{'  vs baseline':<24}" + "".join(f"{d:>10}" for d in deltas))
+
+
+def change(old, new):
+    return (new - old) / old * 100
+
+
+def regressions(results, baseline, threshold):
+    found = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None:
+            continue
+        for key in COMPARED:
+            if b[key] and change(b[key], r[key]) > threshold:
+                found.append(f"{name} {key}: {b[key]} -> {r[key]} ({change(b[key], r[key]):+.0f}%)")
+    return found
+
+
+def main():
+    p = argparse.ArgumentParser(description="Classifier benchmark suite")
+    p.add_argument("--rounds", type=int, default=200)
+    p.add_argument("--repeat", type=int, default=5, help="timed runs per classifier, the best one counts")
+    p.add_argument("--version", default=corpus.DEFAULT_VERSION)
+    p.add_argument("--save", action="store_true", help="write the results as the baseline")
+    p.add_argument("--compare", action="store_true", help="diff against the stored baseline")
+    p.add_argument("--threshold", type=float, default=25, help="regression threshold in percent")
+    args = p.parse_args()
+
+    path = os.path.join(BASELINES_DIR, f"{args.version}.json")
+    results = run(args.version, args.rounds, args.repeat)
+
+    baseline = None
+    if args.compare:
+        with open(path, encoding="utf-8") as f:
+            stored = json.load(f)
+        baseline = stored["classifiers"]
+        print(f"baseline: {path} ({stored['python']}, {stored['machine']}, {stored['rounds']} rounds)")
+    print_results(results, baseline)
+
+    if args.save:
+        os.makedirs(BASELINES_DIR, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": args.version,
+                "rounds": args.rounds,
+                "repeat": args.repeat,
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "classifiers": results,
+            }, f, indent=2)
+            f.write("\n")
+        print(f"saved {path}")
+
+    if baseline:
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Per-message sendMessage latency with and without connection reuse.
+
+    python benchmarks/telegram_http_bench.py [--messages 200] [--tls]
+
+Runs a local Bot API stand-in and sends the same messages twice: once with
+a bare requests.post per message (the old extension.Telegram behaviour),
+once through the pooled extension.Telegram session. --tls serves HTTPS
+with a throwaway self-signed certificate (needs the openssl CLI), which is
+closer to api.telegram.org where the handshake dominates.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+import urllib3
+from extension import Telegram
+from telegram_standin import start_server
+
+TOKEN = "bench"
+
+
+def timed(send, n):
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        send(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name, timings):
+    timings = sorted(timings)
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{name:<22}{statistics.mean(timings):>10.2f}{statistics.median(timings):>10.2f}{p99:>10.2f}")
+
+
+def main():
+    p = argparse.ArgumentParser(description="Telegram connection reuse benchmark")
+    p.add_argument("--messages", type=int, default=200)
+    p.add_argument("--tls", action="store_true")
+    args = p.parse_args()
+
+    warnings.simplefilter("ignore", urllib3.exceptions.InsecureRequestWarning)
+    server, api_url = start_server(args.tls)
+
+    def send_without_reuse(i):
+        requests.post(f"{api_url}/bot{TOKEN}/sendMessage", json={
+            "chat_id": -1, "text": f"signal {i}", "parse_mode": "html", "reply_to_message_id": None,
+        }, verify=False).json()
+
+    bot = Telegram(TOKEN, api_url=api_url)
+    bot.session.verify = False
+    # CA bundle env vars would override verify=False
+    bot.session.trust_env = False
+
+    def send_with_reuse(i):
+        bot.send_message(chat_id=-1, text=f"signal {i}")
+
+    print(f"{api_url}, {args.messages} messages, latency in ms")
+    print(f"{'':<22}{'mean':>10}{'p50':>10}{'p99':>10}")
+    report("requests.post", timed(send_without_reuse, args.messages))
+    report("pooled Telegram", timed(send_with_reuse, args.messages))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from storage import get_storage
+
+logger = logging.getLogger("TGForwarder.channels")
+
+DEFAULT_RELOAD_INTERVAL = 60
+
+
+class ChannelRegistry:
+    """chat_id -> signal_channels record index shared by the listener entry points."""
+
+    def __init__(self, owner: str):
+        self.owner = owner
+        self.channels: Dict[int, dict] = {}
+        self.reloads = 0
+        self.reload_failures = 0
+
+    def query_active(self) -> List[dict]:
+        """Active channels of this owner from the owner-status-index GSI."""
+        return get_storage().channels.active_for_owner(self.owner)
+
+    def load(self) -> "ChannelRegistry":
+        self.replace(self.query_active())
+        return self
+
+    def replace(self, channels: List[dict]) -> Tuple[set, set, set]:
+        """Swap in a new channel set, returns (added, removed, changed) chat_ids."""
+        new = {int(ch["chat_id"]): ch for ch in channels if ch.get("status") == "ACTIVE"}
+        old = self.channels
+        added = new.keys() - old.keys()
+        removed = old.keys() - new.keys()
+        changed = {chat_id for chat_id in new.keys() & old.keys() if new[chat_id] != old[chat_id]}
+        self.channels = new
+        return added, removed, changed
+
+    def get(self, chat_id: int) -> Optional[dict]:
+        return self.channels.get(chat_id)
+
+    @property
+    def chat_ids(self) -> List[int]:
+        return list(self.channels)
+
+    def __contains__(self, chat_id) -> bool:
+        return chat_id in self.channels
+
+    def __len__(self) -> int:
+        return len(self.channels)
+
+    async def watch(self, interval: float = DEFAULT_RELOAD_INTERVAL, on_change: Optional[Callable] = None):
+        """Re-poll signal_channels every `interval` seconds and swap the index.
+
+        `on_change(registry)` runs whenever channels were added or removed,
+        e.g. to re-register Telethon handlers with the new chat_ids.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(interval)
+            started = time.monotonic()
+            try:
+                channels = await loop.run_in_executor(None, self.query_active)
+            except Exception as e:
+                self.reload_failures += 1
+                logger.exception("Channel reload failed (%d failures so far): %s", self.reload_failures, str(e))
+                continue
+            added, removed, changed = self.replace(channels)
+            self.reloads += 1
+            logger.info(
+                "Channel reload #%d in %.0fms: %d active, +%d -%d ~%d",
+                self.reloads, (time.monotonic() - started) * 1000, len(self), len(added), len(removed), len(changed),
+            )
+            if added or removed:
+                logger.info("Channels added=%s removed=%s", sorted(added), sorted(removed))
+                if on_change is not None:
+                    on_change(self)
+
+
+def bind_handlers(client, registry: ChannelRegistry, handlers):
+    """(Re-)register Telethon handlers filtered to the registry's chat_ids.
+
+    `handlers` is a list of (callback, event builder class) pairs.
+    """
+    for callback, event_cls in handlers:
+        client.remove_event_handler(callback)
+        client.add_event_handler(callback, event_cls(chats=registry.chat_ids))
@@ -1,20 +1,10 @@
-import re
 from typing import Dict, List, Optional
+from classifiers import patterns
 
 class FxGoldKillerClassifier:
     def __init__(self):
         # Entry signal patterns for FxGoldKiller
-        self.entry_pattern = re.compile(
-            r'📣(?P<pair>XAUUSD)\s+(?P<side>BUY|SELL)(?:\s+(?:NOW|LIMIT))?\s*📣.*?'
-            r'🔊\s*PRICE\s*:\s*(?P<entry>\d+)\s*'
-            r'(?:.*?✅\s*TP1\s*(?P<tp1>\d+).*?'
-            r'✅\s*TP2\s*(?P<tp2>\d+).*?'
-            r'✅\s*TP3\s*(?P<tp3>\d+).*?'
-            r'✅\s*TP4\s*(?P<tp4>\d+).*?'
-            r'✅\s*TP5\s*(?P<tp5>\d+).*?)?'
-            r'❌\s*SL:\s*(?P<sl>\d+)',
-            re.IGNORECASE | re.DOTALL
-        )
+        self.entry_pattern = patterns.FX_GOLD_KILLER_ENTRY
         
         # TP hit detection patterns
         self.tp_keywords = ['TP', 'HIT', '✅', 'DONE', '🤑', '💰']
@@ -115,11 +105,11 @@ class FxGoldKillerClassifier:
     def _extract_tp(self, message: str) -> Optional[Dict]:
         """Extract TP hit details from FxGoldKiller messages"""
         # Extract TP level (TP1, TP2, etc.)
-        tp_match = re.search(r'TP(\d+)', message, re.IGNORECASE)
+        tp_match = patterns.FX_GOLD_KILLER_TP_LEVEL.search(message)
         tp_level = int(tp_match.group(1)) if tp_match else 1
         
         # Extract pips information if available
-        pips_match = re.search(r'([+-]?\d+)\s*PIPS', message, re.IGNORECASE)
+        pips_match = patterns.FX_GOLD_KILLER_PIPS.search(message)
         pips = int(pips_match.group(1)) if pips_match else None
         
         return {
@@ -130,7 +120,7 @@ class FxGoldKillerClassifier:
     def _extract_sl(self, message: str) -> Optional[Dict]:
         """Extract SL hit details from FxGoldKiller messages"""
         # Extract pips information if available
-        pips_match = re.search(r'([+-]?\d+)\s*PIPS', message, re.IGNORECASE)
+        pips_match = patterns.FX_GOLD_KILLER_PIPS.search(message)
         pips = int(pips_match.group(1)) if pips_match else None
         
         return {
@@ -1,11 +1,19 @@
-import re
 from typing import Dict, List, Optional
+from classifiers import patterns
+
+KEYWORDS = patterns.RUSSIAN_KEYWORDS
+WORKING = KEYWORDS.mask("в работе", "если пропустили")
+TP_PHRASES = KEYWORDS.mask("takeprofit", "tp1 hit", "tp2 hit", "tp3 hit", "tp1 выполнен", "tp достигнут")
+CROSS_MARK = KEYWORDS.mask("❌")
+SL = KEYWORDS.mask("sl")
+PROFIT_INDICATORS = KEYWORDS.mask("фикс", "бу", "безубыток", "плюс", "profit", "профит", "вышли в +")
+PIPS = KEYWORDS.mask("пункт")
 
 # "Остаток закрылся в бу " - Арилжааг хаасан үед ашиглаж байна
 
 class GoldTradingTFEClassifier:
     def __init__(self):
-        self.cancel_pattern = re.compile(r'(Delete|Отмена|Удаляю)\s*❌', re.IGNORECASE)
+        self.cancel_pattern = patterns.RUSSIAN_CANCEL
 
     def process_message(self, message_data: Dict) -> Optional[Dict]:
         msg_text = self._clean_message(message_data.get('msg_text', ''))
@@ -24,25 +32,26 @@ class GoldTradingTFEClassifier:
                 }
 
         if reply_msg_id:
-            if self._is_cancel_message(msg_text):
+            hits = KEYWORDS.scan(msg_text.lower())
+            if self._is_cancel_message(msg_text, hits):
                 return {
                     **message_data,
                     "action": "CANCELLED",
                     "order_id": f"{message_data['chat_id']}_{reply_msg_id}"
                 }
-            elif self._is_tp_message(msg_text):
+            elif self._is_tp_message(msg_text, hits):
                 return {
                     **message_data,
                     "action": "TP_HIT",
                     "order_id": f"{message_data['chat_id']}_{reply_msg_id}"
                 }
-            elif self._is_sl_message(msg_text):
+            elif self._is_sl_message(msg_text, hits):
                 return {
                     **message_data,
                     "action": "SL_HIT",
                     "order_id": f"{message_data['chat_id']}_{reply_msg_id}"
                 }
-            elif self._is_in_profit_update(msg_text):
+            elif self._is_in_profit_update(msg_text, hits):
                 pips = self._extract_pips(msg_text)
                 return {
                     **message_data,
@@ -62,15 +71,7 @@ class GoldTradingTFEClassifier:
         }.get(order_type.upper(), order_type)
 
     def _extract_entry(self, message: str) -> Optional[Dict]:
-        pattern = re.compile(
-            r'(?P<order_type>BuyStop|SellStop|BuyLimit|SellLimit)\s*'
-            r'#(?P<pair>[A-Za-z]+\d*)\s*\((?P<timeframe>[a-z0-9]+)\)[^\n]*\n'
-            r'(?:.*\n)?.*Price:\s*(?P<entry>[\d,.]+)\s*\n'
-            r'.*SL:\s*(?P<sl>[\d,.]+)\s*\n'
-            r'.*TP:\s*(?P<tp>[\d,.]+)',
-            re.IGNORECASE
-        )
-        match = pattern.search(message)
+        match = patterns.RUSSIAN_ENTRY.search(message)
         if not match:
             return None
 
@@ -83,45 +84,33 @@ class GoldTradingTFEClassifier:
             "timeframe": match.group("timeframe")
         }
 
-    def _is_tp_message(self, message: str) -> bool:
-        message_lower = message.lower()
-
+    def _is_tp_message(self, message: str, hits: int) -> bool:
         # Skip common working/neutral messages
-        if any(phrase in message_lower for phrase in ['в работе', 'если пропустили']):
+        if hits & WORKING:
             return False
 
         # Strong TP confirmation keywords
-        tp_phrases = [
-            'takeprofit', 'tp1 hit', 'tp2 hit', 'tp3 hit',
-            'tp1 выполнен', 'tp достигнут'
-        ]
-
-        return any(tp in message_lower for tp in tp_phrases) and not self._is_cancel_message(message)
+        return bool(hits & TP_PHRASES) and not self._is_cancel_message(message, hits)
 
 
-    def _is_sl_message(self, message: str) -> bool:
-        message = message.lower()
-        return '❌' in message and 'sl' in message
+    def _is_sl_message(self, message: str, hits: int) -> bool:
+        return bool(hits & CROSS_MARK and hits & SL)
 
-    def _is_cancel_message(self, message: str) -> bool:
-        return self.cancel_pattern.search(message) is not None
+    def _is_cancel_message(self, message: str, hits: int) -> bool:
+        return bool(hits & CROSS_MARK) and self.cancel_pattern.search(message) is not None
 
-    def _is_in_profit_update(self, message: str) -> bool:
-        message_lower = message.lower()
-
-        if self._is_tp_message(message) or self._is_sl_message(message) or self._is_cancel_message(message):
+    def _is_in_profit_update(self, message: str, hits: int) -> bool:
+        if self._is_tp_message(message, hits) or self._is_sl_message(message, hits) or self._is_cancel_message(message, hits):
             return False
 
         # Consider any message with profit-related phrasing as IN_PROFIT_UPDATE
-        indicators = ['фикс', 'бу', 'безубыток', 'плюс', 'profit', 'профит', 'вышли в +']
-
-        has_indicator = any(ind in message_lower for ind in indicators)
-        has_pips = re.search(r'(\+|плюс)\s*\d+\s*пункт[аов]*', message_lower)
+        has_indicator = bool(hits & PROFIT_INDICATORS)
+        has_pips = hits & PIPS and patterns.RUSSIAN_HAS_PIPS.search(message.lower())
 
-        return has_indicator and has_pips is not None
+        return has_indicator and bool(has_pips)
 
     def _extract_pips(self, message: str) -> Optional[int]:
-        match = re.search(r'(\+|\bплюс\s*)(\d+)\s*пункт[аов]*', message.lower())
+        match = patterns.RUSSIAN_PIPS.search(message.lower())
         if match:
             return int(match.group(2))
         return None
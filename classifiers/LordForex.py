@@ -1,6 +1,6 @@
-import re
 from typing import Dict, Optional
 from enum import Enum
+from classifiers import patterns
 
 class SignalAction(Enum):
     NEW_SIGNAL = "NEW_SIGNAL"
@@ -19,31 +19,13 @@ class LordForexClassifier:
     
     def __init__(self):
         # NEW ORDER pattern with flexible symbol matching
-        self.new_order_pattern = re.compile(
-            r'🔔\s*NEW\s+ORDER\s*-\s*(?P<pair>[A-Z]{2,6}(?:[A-Z0-9]{2,4})?)\s*-\s*(?P<side>Buy|Sell)\s*🔔\s*'
-            r'Entry:\s*(?P<entry>\d+\.\d+)\s*'
-            r'TP\s*@\s*(?P<tp>\d+\.\d+)\s*'
-            r'SL\s*@\s*(?P<sl>\d+\.\d+)\s*'
-            r'ID:\s*(?P<id>\d+)',
-            re.IGNORECASE
-        )
+        self.new_order_pattern = patterns.LORD_NEW_ORDER
         
         # Enhanced CLOSED trade pattern with ID capture and emoji handling
-        self.closed_pattern = re.compile(
-            r'📥\s*CLOSED\s*-\s*(?P<pair>[A-Z]{2,6}(?:[A-Z0-9]{2,4})?)\s*-\s*(?P<side>Buy|Sell)\s*📥\s*'
-            r'Entry:\s*(?P<entry>\d+\.\d+)\s*'
-            r'Exit:\s*(?P<exit>\d+\.\d+)\s*'
-            r'Result:\s*(?P<result>[+-]?\d+\.\d+%)\s*(?:[🟢🔴✅❌]+\s*)?'  # Added emoji handling
-            r'ID:\s*(?P<id>\d+)',
-            re.IGNORECASE
-        )
+        self.closed_pattern = patterns.LORD_CLOSED
         
         # CANCELLED order pattern
-        self.cancelled_pattern = re.compile(
-            r'❌\s*ORDER\s+CANCELLED\s*❌|'
-            r'🚫\s*POSITION\s+CLOSED\s+MANUALLY',
-            re.IGNORECASE
-        )
+        self.cancelled_pattern = patterns.LORD_CANCELLED
 
     def process_message(self, message_data: Dict) -> Dict:
         """
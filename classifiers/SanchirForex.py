@@ -1,6 +1,6 @@
-import re
 from enum import Enum
 from typing import Dict, Optional
+from classifiers import patterns
 
 
 class SignalAction(Enum):
@@ -60,15 +60,8 @@ class SanchirForexClassifier:
         side: Buy
         price: 3300
         """
-        # Regex to match pair, side, and price (supports Buy, Sell, Buy_Limit, Sell_Limit)
-        pattern = re.compile(
-            r"pair:\s*(?P<pair>\w+)\s*[\r\n]+"
-            r"side:\s*(?P<side>BUY|SELL|BUY_LIMIT|SELL_LIMIT|Buy|Sell|Buy_Limit|Sell_Limit)\s*[\r\n]+"
-            r"price:\s*(?P<price>\d+(?:\.\d+)?)",
-            re.IGNORECASE
-        )
-
-        match = pattern.search(message)
+        # Matches pair, side, and price (supports Buy, Sell, Buy_Limit, Sell_Limit)
+        match = patterns.SANCHIR_ENTRY.search(message)
         if match:
             pair = match.group("pair").upper()
             order_type = match.group("side").upper().replace(" ", "_")
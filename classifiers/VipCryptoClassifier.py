@@ -1,27 +1,13 @@
-import re
 from typing import Optional, Dict, List, Union
+from classifiers import patterns
 
 class VipCryptoClassifier:
     def __init__(self):
         # Entry signal patterns
-        self.entry_pattern = re.compile(
-            r'🟢\s*(?P<side>Long|Short)\s*'
-            r'Name:\s*(?P<pair>[A-Z]+/USDT)\s*'
-            r'Margin\s+mode:\s*(?P<margin_info>.*?)\s*'
-            r'↪️\s*Entry\s+price\(USDT\):\s*'
-            r'(?P<entry>[\d.]+)\s*'
-            r'Targets\(USDT\):\s*'
-            r'(?P<targets>.*?)(?=\n|$)',
-            re.IGNORECASE | re.DOTALL
-        )
+        self.entry_pattern = patterns.VIP_CRYPTO_ENTRY
         
         # TP hit pattern
-        self.tp_hit_pattern = re.compile(
-            r'💸\s*(?P<pair>[A-Z]+/USDT)\s*'
-            r'✅\s*Target\s*#(?P<tp_level>\d+)\s*Done\s*'
-            r'Current\s+profit:\s*(?P<profit_percent>\d+)%',
-            re.IGNORECASE | re.DOTALL
-        )
+        self.tp_hit_pattern = patterns.VIP_CRYPTO_TP_HIT
 
     def process_message(self, msg: dict) -> Optional[dict]:
         """Process a Telegram message and extract VipCrypto trading signal information."""
@@ -82,8 +68,8 @@ class VipCryptoClassifier:
     def _normalize_text(self, text: str) -> str:
         """Normalize text for consistent processing."""
         text = text.strip()
-        text = re.sub(r'[\xa0\u200b\u202f]', ' ', text)  # Replace special spaces
-        text = re.sub(r'\s+', ' ', text)  # Collapse multiple spaces
+        text = patterns.SPECIAL_SPACES.sub(' ', text)  # Replace special spaces
+        text = patterns.WHITESPACE_RUN.sub(' ', text)  # Collapse multiple spaces
         return text
 
     def _is_tp_hit(self, text: str) -> bool:
@@ -109,7 +95,7 @@ class VipCryptoClassifier:
         
         # Extract leverage from margin info (e.g., "Cross (75X)")
         margin_info = match.group("margin_info")
-        leverage_match = re.search(r'\((\d+)X\)', margin_info, re.IGNORECASE)
+        leverage_match = patterns.VIP_CRYPTO_LEVERAGE.search(margin_info)
         if leverage_match:
             data["leverage"] = int(leverage_match.group(1))
         else:
@@ -128,7 +114,7 @@ class VipCryptoClassifier:
         targets = []
         
         # Pattern for targets like "1) 0.3836"
-        target_matches = re.findall(r'\d+\)\s*([\d.]+)', targets_text)
+        target_matches = patterns.VIP_CRYPTO_TARGET.findall(targets_text)
         for target in target_matches:
             try:
                 targets.append(float(target))
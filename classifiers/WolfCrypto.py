@@ -1,5 +1,23 @@
-import re
 from typing import Optional, Dict, List, Union
+from classifiers import patterns
+
+KEYWORDS = patterns.WOLF_CRYPTO_KEYWORDS
+TP = KEYWORDS.mask("tp")
+TAKE_PROFIT = KEYWORDS.mask("take profit")
+TP_HIT_WORDS = KEYWORDS.mask("hit", "reached", "completed")
+SL = KEYWORDS.mask("sl")
+STOP_LOSS = KEYWORDS.mask("stop loss")
+SL_HIT_WORDS = KEYWORDS.mask("hit", "reached", "triggered")
+CANCELLED_WORDS = KEYWORDS.mask(
+    "cancelled", "considered as null", "didn’t reach the entry zone", "didn't reach the entry zone"
+)
+SIGNAL_WORDS = KEYWORDS.mask("entry", "enter", "buy", "sell", "long", "short")
+BUY = KEYWORDS.mask("buy", "long")
+SELL = KEYWORDS.mask("sell", "short")
+CHECK_MARK = KEYWORDS.mask("✅")
+BTC = KEYWORDS.mask("btc")
+MANUALLY = KEYWORDS.mask("manually")
+USDT = KEYWORDS.mask("/usdt")
 
 class WolfCryptoClassifier:
     def process_message(self, msg: dict) -> Optional[dict]:
@@ -9,15 +27,17 @@ class WolfCryptoClassifier:
 
         # Normalize text
         text = self._normalize_text(text)
+        text_lower = text.lower()
+        hits = KEYWORDS.scan(text_lower)
 
         # Detect signal type
-        if self._is_tp_hit(text):
+        if self._is_tp_hit(text, hits):
             action = "TP_HIT"
-        elif self._is_sl_hit(text):
+        elif self._is_sl_hit(text, hits):
             action = "SL_HIT"
-        elif self._is_cancelled(text):
+        elif self._is_cancelled(text, hits):
             action = "CANCELLED"
-        elif self._is_new_signal(text):
+        elif self._is_new_signal(text, hits):
             action = "NEW_SIGNAL"
         else:
             action = "OTHER"
@@ -46,7 +66,7 @@ class WolfCryptoClassifier:
 
         # Extract additional data based on action type
         if action == "NEW_SIGNAL":
-            signal_data = self._extract_new_signal_data(text)
+            signal_data = self._extract_new_signal_data(text, text_lower, hits)
             result.update(signal_data)
             # Convert empty take_profit list to None
             if "take_profit" in result and isinstance(result["take_profit"], list) and not result["take_profit"]:
@@ -70,114 +90,78 @@ class WolfCryptoClassifier:
     def _normalize_text(self, text: str) -> str:
         """Normalize text for consistent processing."""
         text = text.strip()
-        text = re.sub(r'[\xa0\u200b\u202f]', ' ', text)  # Replace special spaces
-        text = re.sub(r'\s+', ' ', text)  # Collapse multiple spaces
+        text = patterns.SPECIAL_SPACES.sub(' ', text)  # Replace special spaces
+        text = patterns.WHITESPACE_RUN.sub(' ', text)  # Collapse multiple spaces
         text = text.replace('💰', '').replace('🚫', '').replace('✅', '').replace('🔹', '')
         return text
 
-    def _is_tp_hit(self, text: str) -> bool:
+    def _is_tp_hit(self, text: str, hits: int) -> bool:
         """Check if message indicates a take profit hit."""
-        text_lower = text.lower()
         return (
-            ("tp" in text_lower and any(word in text_lower for word in ["hit", "reached", "completed"])) or
-            ("take profit" in text_lower and any(word in text_lower for word in ["hit", "reached", "completed"])) or
-            bool(re.search(r"✅+\s*[A-Z]{2,10}/USDT\s*TP\d", text)) or
-            bool(re.search(r"BTC/USDT TP\d", text, re.IGNORECASE))
+            bool(hits & (TP | TAKE_PROFIT) and hits & TP_HIT_WORDS) or
+            bool(hits & CHECK_MARK and hits & TP and patterns.WOLF_CRYPTO_TP_PAIR.search(text)) or
+            bool(hits & BTC and hits & TP and patterns.WOLF_CRYPTO_BTC_TP.search(text))
         )
 
-    def _is_sl_hit(self, text: str) -> bool:
+    def _is_sl_hit(self, text: str, hits: int) -> bool:
         """Check if message indicates a stop loss hit."""
-        text_lower = text.lower()
         return (
-            ("sl" in text_lower and any(word in text_lower for word in ["hit", "reached", "triggered"])) or
-            ("stop loss" in text_lower and any(word in text_lower for word in ["hit", "reached", "triggered"])) or
-            bool(re.search(r"BTC hit Stop Loss", text, re.IGNORECASE))
+            bool(hits & (SL | STOP_LOSS) and hits & SL_HIT_WORDS) or
+            bool(hits & BTC and patterns.WOLF_CRYPTO_BTC_SL.search(text))
         )
 
-    def _is_cancelled(self, text: str) -> bool:
+    def _is_cancelled(self, text: str, hits: int) -> bool:
         """Check if message indicates a cancelled order."""
-        text_lower = text.lower()
         return (
-            "cancelled" in text_lower or
-            "considered as null" in text_lower or
-            "didn’t reach the entry zone" in text_lower or
-            "didn't reach the entry zone" in text_lower or
-            bool(re.search(r"#\w+/USDT\s+Manually\s+Cancelled", text, re.IGNORECASE))
+            bool(hits & CANCELLED_WORDS) or
+            bool(hits & MANUALLY and patterns.WOLF_CRYPTO_MANUAL_CANCEL.search(text))
         )
 
-    def _is_new_signal(self, text: str) -> bool:
+    def _is_new_signal(self, text: str, hits: int) -> bool:
         """Check if message is a new trading signal."""
-        has_pair = re.search(r"\b([A-Z]{2,10}/USDT)\b", text) is not None
-        has_signal_keywords = any(
-            phrase in text.lower() 
-            for phrase in ['entry', 'enter', 'buy', 'sell', 'long', 'short']
-        )
-        has_tp_sl = (
-            ('tp' in text.lower() or 'take profit' in text.lower()) and
-            ('sl' in text.lower() or 'stop loss' in text.lower())
-        )
+        has_pair = bool(hits & USDT) and patterns.USDT_PAIR.search(text) is not None
+        has_signal_keywords = bool(hits & SIGNAL_WORDS)
+        has_tp_sl = bool(hits & (TP | TAKE_PROFIT) and hits & (SL | STOP_LOSS))
         return has_pair and (has_signal_keywords or has_tp_sl)
 
-    def _extract_new_signal_data(self, text: str) -> Dict:
+    def _extract_new_signal_data(self, text: str, text_lower: str, hits: int) -> Dict:
         """Extract trading details from new signal message."""
         data = {}
-        text_lower = text.lower()
         
         # Extract pair
-        pair_match = re.search(r"\b([A-Z]{2,10}/USDT)\b", text)
+        pair_match = patterns.USDT_PAIR.search(text)
         data["pair"] = pair_match.group(1) if pair_match else None
         
         # Extract side (default to sell if not specified)
-        if 'buy' in text_lower or 'long' in text_lower:
+        if hits & BUY:
             data["side"] = "BUY"
-        elif 'sell' in text_lower or 'short' in text_lower:
+        elif hits & SELL:
             data["side"] = "SELL"
         else:
             # Default to sell if not specified (common in some signal formats)
             data["side"] = "None"
         
         # Extract entry price
-        entry_match = re.search(
-            r"(?:entry|enter|below|above|price)[: ]+([\d.,]+)|"
-            r"enter (?:above|below):\s*([\d.,]+)|"
-            r"🔹Enter (?:below|above):\s*([\d.,]+)",
-            text_lower
-        )
+        entry_match = patterns.WOLF_CRYPTO_ENTRY.search(text_lower)
         if entry_match:
             entry_str = next(g for g in entry_match.groups() if g is not None)
             data["entry"] = float(entry_str.replace(',', ''))
         
         # Extract stop loss - improved pattern
-        sl_match = re.search(
-            r"(?:sl|stop loss|🚫sl)[: ]+([\d.,]+)|"
-            r"🚫sl\s*([\d.,]+)|"
-            r"sl\s*[:=]?\s*([\d.,]+)",
-            text,
-            re.IGNORECASE
-        )
+        sl_match = patterns.WOLF_CRYPTO_SL.search(text)
         if sl_match:
             sl_str = next(g for g in sl_match.groups() if g is not None)
             data["stop_loss"] = float(sl_str.replace(',', ''))
         
         # Extract take profits - improved pattern
-        tps = re.findall(
-            r"(?:tp|take profit|💰tp)\d*[: ]+([\d.,]+)|"
-            r"💰tp\d*\s*([\d.,]+)|"
-            r"tp\d*\s*[:=]?\s*([\d.,]+)",
-            text,
-            re.IGNORECASE
-        )
+        tps = patterns.WOLF_CRYPTO_TPS.findall(text)
         if tps:
             data["take_profit"] = [float(tp.replace(',', '')) for match in tps for tp in match if tp]
         else:
             data["take_profit"] = None
         
         # Extract leverage
-        lev_match = re.search(
-            r"(?:leverage|lev|〽️leverage)[: ]*\s*(\d+)x",
-            text,
-            re.IGNORECASE
-        )
+        lev_match = patterns.WOLF_CRYPTO_LEVERAGE.search(text)
         if lev_match and lev_match.group(1):
             try:
                 data["leverage"] = int(lev_match.group(1))
@@ -193,14 +177,14 @@ class WolfCryptoClassifier:
         data = {}
         
         # Extract pair
-        pair_match = re.search(r"\b([A-Z]{2,10}/USDT)\b", text)
+        pair_match = patterns.USDT_PAIR.search(text)
         if pair_match:
             data["pair"] = pair_match.group(1)
         
         # Extract TP level (for TP_HIT only)
-        tp_num_match = re.search(r"TP\s?(\d+)", text, re.IGNORECASE)
-        tp_word_match = re.search(r"Take Profit\s(\d+)", text, re.IGNORECASE)
-        tp_ordinal_match = re.search(r"(first|1st|second|2nd|third|3rd)\s(?:take profit|tp)", text, re.IGNORECASE)
+        tp_num_match = patterns.WOLF_CRYPTO_TP_NUM.search(text)
+        tp_word_match = patterns.WOLF_CRYPTO_TP_WORD.search(text)
+        tp_ordinal_match = patterns.WOLF_CRYPTO_TP_ORDINAL.search(text)
         
         if tp_num_match:
             data["tp_level"] = int(tp_num_match.group(1))
@@ -215,8 +199,8 @@ class WolfCryptoClassifier:
             data["tp_level"] = ordinal_map.get(tp_ordinal_match.group(1).lower(), 1)
         
         # Extract profit percentage
-        profit_match = re.search(r"Profit(?: Made)?:\s*([\d.]+)%", text, re.IGNORECASE) or \
-                     re.search(r"([\d.]+)%\s*profit", text, re.IGNORECASE)
+        profit_match = patterns.WOLF_CRYPTO_PROFIT.search(text) or \
+                     patterns.WOLF_CRYPTO_PROFIT_SUFFIX.search(text)
         if profit_match:
             data["profit_percent"] = float(profit_match.group(1))
         
@@ -225,7 +209,7 @@ class WolfCryptoClassifier:
     def _extract_cancelled_data(self, text: str) -> Dict:
         """Extract data from cancelled messages."""
         data = {}
-        pair_match = re.search(r"#(\w+)/USDT", text)
+        pair_match = patterns.WOLF_CRYPTO_CANCELLED_PAIR.search(text)
         if pair_match:
             data["pair"] = f"{pair_match.group(1)}/USDT"
         return data
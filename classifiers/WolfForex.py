@@ -1,5 +1,5 @@
-import re
 from typing import Dict, List, Optional
+from classifiers import patterns
 
 class WolfForexClassifier:
     """
@@ -11,12 +11,7 @@ class WolfForexClassifier:
     
     def __init__(self):
         # Entry pattern
-        self.entry_pattern = re.compile(
-            r'(?P<pair>[A-Z]{2,6}(?:[A-Z0-9]{2})?)\s*[📈📉↗↘]\s*(?P<side>BUY|SELL)\s*(?P<entry>\d+\.\d+)\s*'
-            r'(.*?(?:TP|Take Profit)\s*(?P<tps>[\d\s\.]+).*?'
-            r'(?:SL|Stop Loss)\s*(?P<sl>\d+\.\d+))',
-            re.IGNORECASE | re.DOTALL
-        )
+        self.entry_pattern = patterns.WOLF_FOREX_ENTRY
         
         # TP hit detection patterns
         self.tp_keywords = ['TP', 'Take Profit', 'Profit Taken', '✅', '💚']
@@ -68,7 +63,7 @@ class WolfForexClassifier:
             return None
             
         # Extract all TP prices
-        tps = re.findall(r'(?:💰TP|TP|Take Profit)\s*\d*\s*(\d+\.\d+)', message)
+        tps = patterns.WOLF_FOREX_TPS.findall(message)
         return {
             "pair": match.group('pair'),
             "side": match.group('side'),
@@ -88,11 +83,11 @@ class WolfForexClassifier:
     def _extract_tp(self, message: str) -> Optional[Dict]:
         """Extract TP hit details"""
         # Get TP level (default to 1 if not specified)
-        level_match = re.search(r'(?:TP|Take Profit)\s*(\d+)', message, re.IGNORECASE)
+        level_match = patterns.WOLF_FOREX_TP_LEVEL.search(message)
         tp_level = int(level_match.group(1)) if level_match else 1
         
         # Try to get exit price (optional)
-        price_match = re.search(r'@\s*(\d+\.\d+)', message)
+        price_match = patterns.WOLF_FOREX_EXIT_PRICE.search(message)
         exit_price = float(price_match.group(1)) if price_match else None
         
         return {
@@ -103,7 +98,7 @@ class WolfForexClassifier:
     def _extract_sl(self, message: str) -> Optional[Dict]:
         """Extract SL hit details"""
         # Try to get exit price (optional)
-        price_match = re.search(r'@\s*(\d+\.\d+)', message)
+        price_match = patterns.WOLF_FOREX_EXIT_PRICE.search(message)
         exit_price = float(price_match.group(1)) if price_match else None
         
         return {
@@ -1,56 +1,145 @@
-from classifiers.LordForex import LordForexClassifier
-from classifiers.VipCryptoClassifier import VipCryptoClassifier
-from classifiers.VipCryptoClassifier import VipCryptoClassifier
-from classifiers.WolfForex import WolfForexClassifier
-from classifiers.WolfCrypto import WolfCryptoClassifier
-from classifiers.RussianForex import RussianForexClassifier
-from classifiers.FxGoldKiller import FxGoldKillerClassifier
-from classifiers.SanchirForex import SanchirForexClassifier
-from classifiers.GoldTradingTFE import GoldTradingTFEClassifier
-from typing import Dict, Optional
+import importlib
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Classifier name -> (module, class). Modules are imported the first time a
+# routed message needs them, so a cold start only pays for the classifiers
+# (and their regex compilation) it actually uses.
+CLASSIFIERS = {
+    'wolf_forex': ('classifiers.WolfForex', 'WolfForexClassifier'),
+    'lord_forex': ('classifiers.LordForex', 'LordForexClassifier'),
+    'wolf_crypto': ('classifiers.WolfCrypto', 'WolfCryptoClassifier'),
+    'russian_forex': ('classifiers.RussianForex', 'RussianForexClassifier'),
+    'gold_trading_tfe': ('classifiers.GoldTradingTFE', 'GoldTradingTFEClassifier'),
+    'vip_crypto': ('classifiers.VipCryptoClassifier', 'VipCryptoClassifier'),
+    'sanchir_forex': ('classifiers.SanchirForex', 'SanchirForexClassifier'),
+    'fx_gold_killer': ('classifiers.FxGoldKiller', 'FxGoldKillerClassifier'),
+}
+
+# Fallback chat_id -> classifier routes, used until (and whenever) the
+# signal_channels table has no `classifier` value for a channel.
+DEFAULT_ROUTES = {
+    -1001485605405: 'wolf_forex',
+    # -1002587201256: 'lord_forex',
+    -1001338521686: 'wolf_crypto',
+    -1001297727353: 'russian_forex',
+    -1002343296096: 'vip_crypto',
+    -1001717291385: 'gold_trading_tfe',
+    -1003006608856: 'sanchir_forex',
+    -1002643902459: 'russian_forex',
+    -1002587201256: 'vip_crypto',
+    -1001150362511: 'fx_gold_killer',
+}
+
+ROUTES_TTL_SECONDS = 300
+
+# process_batch() stays in-process below this many messages, a worker pool
+# costs more to start than it saves on small batches
+BATCH_PARALLEL_MIN = 5000
+BATCH_CHUNK_SIZE = 1000
 
 
 class ForexSignalProcessor:
     """Main processor that routes messages to appropriate classifiers"""
-    
-    def __init__(self):
-        self.classifiers = {
-            'wolf_forex': WolfForexClassifier(),
-            'lord_forex': LordForexClassifier(),
-            'wolf_crypto': WolfCryptoClassifier(),
-            'russian_forex': RussianForexClassifier(),
-            'gold_trading_tfe': GoldTradingTFEClassifier(),
-            'vip_crypto': VipCryptoClassifier(),
-            'sanchir_forex': SanchirForexClassifier(),
-            'fx_gold_killer': FxGoldKillerClassifier(),
-        }
-    
+
+    def __init__(self, route_loader: Optional[Callable[[], Dict[int, str]]] = None, ttl: float = ROUTES_TTL_SECONDS):
+        # Instances created so far, by name; see classifier()
+        self.classifiers = {}
+        self.route_loader = route_loader
+        self.ttl = ttl
+        # chat_id -> classifier name, loaded on first use
+        self.routes = {}
+        self.routes_loaded_at = None
+
+    def classifier(self, name: str):
+        """The classifier called `name`, imported and built on first use."""
+        classifier = self.classifiers.get(name)
+        if classifier is None:
+            module, cls = CLASSIFIERS[name]
+            classifier = self.classifiers[name] = getattr(importlib.import_module(module), cls)()
+        return classifier
+
+    def refresh_routes(self):
+        """Rebuild the chat_id -> classifier table from the route loader.
+
+        Loader failures keep the previous table so a DynamoDB hiccup never
+        stops routing.
+        """
+        routes = dict(DEFAULT_ROUTES)
+        if self.route_loader is not None:
+            try:
+                loaded = self.route_loader()
+            except Exception as e:
+                print(f"Failed to load classifier routes: {e}")
+                if self.routes:
+                    self.routes_loaded_at = time.monotonic()
+                    return self.routes
+                loaded = {}
+            for chat_id, name in loaded.items():
+                if name in CLASSIFIERS:
+                    routes[int(chat_id)] = name
+                else:
+                    print(f"Unknown classifier '{name}' for chat_id {chat_id}, skipping")
+        self.routes = routes
+        self.routes_loaded_at = time.monotonic()
+        return self.routes
+
+    def route_names(self) -> Dict[int, str]:
+        """Current routes as chat_id -> classifier name."""
+        if self.routes_loaded_at is None:
+            self.refresh_routes()
+        return dict(self.routes)
+
+    def get_classifier(self, chat_id: int):
+        if self.routes_loaded_at is None or time.monotonic() - self.routes_loaded_at > self.ttl:
+            self.refresh_routes()
+        name = self.routes.get(chat_id)
+        return self.classifier(name) if name is not None else None
+
     def process_message(self, message_data: dict) -> Optional[Dict]:
         """Determine which classifier to use and process the message"""
-        # Detect signal source
-        if message_data['chat_id'] == -1001485605405:
-            classifier = self.classifiers['wolf_forex']
-        # elif message_data['chat_id'] == -1002587201256:
-        #     classifier = self.classifiers['lord_forex']
-        elif message_data['chat_id'] == -1001338521686:
-            classifier = self.classifiers['wolf_crypto']
-        elif message_data['chat_id'] == -1001297727353:
-            classifier = self.classifiers['russian_forex']
-        elif message_data['chat_id'] == -1002343296096:
-            classifier = self.classifiers['vip_crypto']
-        elif message_data['chat_id'] == -1001717291385:
-            classifier = self.classifiers['gold_trading_tfe']
-            
-        elif message_data['chat_id'] == -1003006608856:
-            classifier = self.classifiers['sanchir_forex']
-            
-        elif message_data['chat_id'] == -1002643902459:
-            classifier = self.classifiers['russian_forex']
-        elif message_data['chat_id'] == -1002587201256:
-            classifier = self.classifiers['vip_crypto']
-        elif message_data['chat_id'] == -1001150362511:
-            classifier = self.classifiers['fx_gold_killer']
-        else:
+        classifier = self.get_classifier(message_data['chat_id'])
+        if classifier is None:
             return None
-            
+
         return classifier.process_message(message_data)
+
+    def process_batch(self, messages: Iterable[dict], workers: Optional[int] = None,
+                      min_parallel: int = BATCH_PARALLEL_MIN, chunk_size: int = BATCH_CHUNK_SIZE) -> List[Optional[Dict]]:
+        """Classify many messages, results in input order.
+
+        Batches smaller than `min_parallel` (or workers=1) run in-process.
+        Larger ones are split into `chunk_size` chunks across a process pool
+        whose workers each build their classifiers once, routed with a
+        snapshot of this processor's routes.
+        """
+        messages = list(messages)
+        if len(messages) < min_parallel or workers == 1:
+            return [self.process_message(message) for message in messages]
+
+        # Imported here, it is ~20ms of cold start for the Lambda that never uses it
+        from concurrent.futures import ProcessPoolExecutor
+        chunks = [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+        results = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(self.route_names(),)) as pool:
+            for chunk_results in pool.map(_process_chunk, chunks):
+                results.extend(chunk_results)
+        return results
+
+
+# Per worker process, set up by _init_batch_worker
+_batch_processor: Optional[ForexSignalProcessor] = None
+
+
+def _init_batch_worker(routes: Dict[int, str]):
+    global _batch_processor
+    _batch_processor = ForexSignalProcessor(route_loader=lambda: routes, ttl=float("inf"))
+    # Build every routed classifier before the first chunk arrives, so no
+    # message pays for imports and regex compilation
+    for name in set(_batch_processor.route_names().values()):
+        _batch_processor.classifier(name)
+
+
+def _process_chunk(messages: List[dict]) -> List[Optional[Dict]]:
+    return [_batch_processor.process_message(message) for message in messages]
@@ -0,0 +1,151 @@
+"""Precompiled regex patterns shared by all classifiers.
+
+Everything here is compiled once at import so the per-message hot path only
+runs matches. Patterns are grouped by the classifier that owns them; the
+few used by more than one classifier live under "shared". The *_KEYWORDS
+prefilters are matched against the lowercased text.
+"""
+import re
+from classifiers.prefilter import KeywordPrefilter
+
+# --- shared ---------------------------------------------------------------
+SPECIAL_SPACES = re.compile(r'[\xa0\u200b\u202f]')
+WHITESPACE_RUN = re.compile(r'\s+')
+USDT_PAIR = re.compile(r"\b([A-Z]{2,10}/USDT)\b")
+
+# --- WolfCrypto -----------------------------------------------------------
+WOLF_CRYPTO_TP_PAIR = re.compile(r"✅+\s*[A-Z]{2,10}/USDT\s*TP\d")
+WOLF_CRYPTO_BTC_TP = re.compile(r"BTC/USDT TP\d", re.IGNORECASE)
+WOLF_CRYPTO_BTC_SL = re.compile(r"BTC hit Stop Loss", re.IGNORECASE)
+WOLF_CRYPTO_MANUAL_CANCEL = re.compile(r"#\w+/USDT\s+Manually\s+Cancelled", re.IGNORECASE)
+# Matched against the lowercased text
+WOLF_CRYPTO_ENTRY = re.compile(
+    r"(?:entry|enter|below|above|price)[: ]+([\d.,]+)|"
+    r"enter (?:above|below):\s*([\d.,]+)|"
+    r"🔹Enter (?:below|above):\s*([\d.,]+)"
+)
+WOLF_CRYPTO_SL = re.compile(
+    r"(?:sl|stop loss|🚫sl)[: ]+([\d.,]+)|"
+    r"🚫sl\s*([\d.,]+)|"
+    r"sl\s*[:=]?\s*([\d.,]+)",
+    re.IGNORECASE
+)
+WOLF_CRYPTO_TPS = re.compile(
+    r"(?:tp|take profit|💰tp)\d*[: ]+([\d.,]+)|"
+    r"💰tp\d*\s*([\d.,]+)|"
+    r"tp\d*\s*[:=]?\s*([\d.,]+)",
+    re.IGNORECASE
+)
+WOLF_CRYPTO_LEVERAGE = re.compile(r"(?:leverage|lev|〽️leverage)[: ]*\s*(\d+)x", re.IGNORECASE)
+WOLF_CRYPTO_TP_NUM = re.compile(r"TP\s?(\d+)", re.IGNORECASE)
+WOLF_CRYPTO_TP_WORD = re.compile(r"Take Profit\s(\d+)", re.IGNORECASE)
+WOLF_CRYPTO_TP_ORDINAL = re.compile(r"(first|1st|second|2nd|third|3rd)\s(?:take profit|tp)", re.IGNORECASE)
+WOLF_CRYPTO_PROFIT = re.compile(r"Profit(?: Made)?:\s*([\d.]+)%", re.IGNORECASE)
+WOLF_CRYPTO_PROFIT_SUFFIX = re.compile(r"([\d.]+)%\s*profit", re.IGNORECASE)
+WOLF_CRYPTO_CANCELLED_PAIR = re.compile(r"#(\w+)/USDT")
+WOLF_CRYPTO_KEYWORDS = KeywordPrefilter([
+    "tp", "take profit", "hit", "reached", "completed",
+    "sl", "stop loss", "triggered",
+    "cancelled", "considered as null", "didn’t reach the entry zone", "didn't reach the entry zone",
+    "entry", "enter", "buy", "sell", "long", "short",
+    # regex gates
+    "✅", "btc", "manually", "/usdt",
+])
+
+# --- WolfForex ------------------------------------------------------------
+WOLF_FOREX_ENTRY = re.compile(
+    r'(?P<pair>[A-Z]{2,6}(?:[A-Z0-9]{2})?)\s*[📈📉↗↘]\s*(?P<side>BUY|SELL)\s*(?P<entry>\d+\.\d+)\s*'
+    r'(.*?(?:TP|Take Profit)\s*(?P<tps>[\d\s\.]+).*?'
+    r'(?:SL|Stop Loss)\s*(?P<sl>\d+\.\d+))',
+    re.IGNORECASE | re.DOTALL
+)
+WOLF_FOREX_TPS = re.compile(r'(?:💰TP|TP|Take Profit)\s*\d*\s*(\d+\.\d+)')
+WOLF_FOREX_TP_LEVEL = re.compile(r'(?:TP|Take Profit)\s*(\d+)', re.IGNORECASE)
+WOLF_FOREX_EXIT_PRICE = re.compile(r'@\s*(\d+\.\d+)')
+
+# --- RussianForex / GoldTradingTFE (same channel format) -------------------
+RUSSIAN_CANCEL = re.compile(r'(Delete|Отмена|Удаляю)\s*❌', re.IGNORECASE)
+RUSSIAN_ENTRY = re.compile(
+    r'(?P<order_type>BuyStop|SellStop|BuyLimit|SellLimit)\s*'
+    r'#(?P<pair>[A-Za-z]+\d*)\s*\((?P<timeframe>[a-z0-9]+)\)[^\n]*\n'
+    r'(?:.*\n)?.*Price:\s*(?P<entry>[\d,.]+)\s*\n'
+    r'.*SL:\s*(?P<sl>[\d,.]+)\s*\n'
+    r'.*TP:\s*(?P<tp>[\d,.]+)',
+    re.IGNORECASE
+)
+# Both matched against the lowercased text
+RUSSIAN_HAS_PIPS = re.compile(r'(\+|плюс)\s*\d+\s*пункт[аов]*')
+RUSSIAN_PIPS = re.compile(r'(\+|\bплюс\s*)(\d+)\s*пункт[аов]*')
+RUSSIAN_KEYWORDS = KeywordPrefilter([
+    "в работе", "если пропустили",
+    "takeprofit", "tp1 hit", "tp2 hit", "tp3 hit", "tp1 выполнен", "tp достигнут",
+    "❌", "sl",
+    "фикс", "бу", "безубыток", "плюс", "profit", "профит", "вышли в +",
+    "пункт",
+])
+
+# --- FxGoldKiller ---------------------------------------------------------
+FX_GOLD_KILLER_ENTRY = re.compile(
+    r'📣(?P<pair>XAUUSD)\s+(?P<side>BUY|SELL)(?:\s+(?:NOW|LIMIT))?\s*📣.*?'
+    r'🔊\s*PRICE\s*:\s*(?P<entry>\d+)\s*'
+    r'(?:.*?✅\s*TP1\s*(?P<tp1>\d+).*?'
+    r'✅\s*TP2\s*(?P<tp2>\d+).*?'
+    r'✅\s*TP3\s*(?P<tp3>\d+).*?'
+    r'✅\s*TP4\s*(?P<tp4>\d+).*?'
+    r'✅\s*TP5\s*(?P<tp5>\d+).*?)?'
+    r'❌\s*SL:\s*(?P<sl>\d+)',
+    re.IGNORECASE | re.DOTALL
+)
+FX_GOLD_KILLER_TP_LEVEL = re.compile(r'TP(\d+)', re.IGNORECASE)
+FX_GOLD_KILLER_PIPS = re.compile(r'([+-]?\d+)\s*PIPS', re.IGNORECASE)
+
+# --- VipCrypto ------------------------------------------------------------
+VIP_CRYPTO_ENTRY = re.compile(
+    r'🟢\s*(?P<side>Long|Short)\s*'
+    r'Name:\s*(?P<pair>[A-Z]+/USDT)\s*'
+    r'Margin\s+mode:\s*(?P<margin_info>.*?)\s*'
+    r'↪️\s*Entry\s+price\(USDT\):\s*'
+    r'(?P<entry>[\d.]+)\s*'
+    r'Targets\(USDT\):\s*'
+    r'(?P<targets>.*?)(?=\n|$)',
+    re.IGNORECASE | re.DOTALL
+)
+VIP_CRYPTO_TP_HIT = re.compile(
+    r'💸\s*(?P<pair>[A-Z]+/USDT)\s*'
+    r'✅\s*Target\s*#(?P<tp_level>\d+)\s*Done\s*'
+    r'Current\s+profit:\s*(?P<profit_percent>\d+)%',
+    re.IGNORECASE | re.DOTALL
+)
+VIP_CRYPTO_LEVERAGE = re.compile(r'\((\d+)X\)', re.IGNORECASE)
+VIP_CRYPTO_TARGET = re.compile(r'\d+\)\s*([\d.]+)')
+
+# --- LordForex ------------------------------------------------------------
+LORD_NEW_ORDER = re.compile(
+    r'🔔\s*NEW\s+ORDER\s*-\s*(?P<pair>[A-Z]{2,6}(?:[A-Z0-9]{2,4})?)\s*-\s*(?P<side>Buy|Sell)\s*🔔\s*'
+    r'Entry:\s*(?P<entry>\d+\.\d+)\s*'
+    r'TP\s*@\s*(?P<tp>\d+\.\d+)\s*'
+    r'SL\s*@\s*(?P<sl>\d+\.\d+)\s*'
+    r'ID:\s*(?P<id>\d+)',
+    re.IGNORECASE
+)
+LORD_CLOSED = re.compile(
+    r'📥\s*CLOSED\s*-\s*(?P<pair>[A-Z]{2,6}(?:[A-Z0-9]{2,4})?)\s*-\s*(?P<side>Buy|Sell)\s*📥\s*'
+    r'Entry:\s*(?P<entry>\d+\.\d+)\s*'
+    r'Exit:\s*(?P<exit>\d+\.\d+)\s*'
+    r'Result:\s*(?P<result>[+-]?\d+\.\d+%)\s*(?:[🟢🔴✅❌]+\s*)?'  # Added emoji handling
+    r'ID:\s*(?P<id>\d+)',
+    re.IGNORECASE
+)
+LORD_CANCELLED = re.compile(
+    r'❌\s*ORDER\s+CANCELLED\s*❌|'
+    r'🚫\s*POSITION\s+CLOSED\s+MANUALLY',
+    re.IGNORECASE
+)
+
+# --- SanchirForex ---------------------------------------------------------
+SANCHIR_ENTRY = re.compile(
+    r"pair:\s*(?P<pair>\w+)\s*[\r\n]+"
+    r"side:\s*(?P<side>BUY|SELL|BUY_LIMIT|SELL_LIMIT|Buy|Sell|Buy_Limit|Sell_Limit)\s*[\r\n]+"
+    r"price:\s*(?P<price>\d+(?:\.\d+)?)",
+    re.IGNORECASE
+)
@@ -0,0 +1,33 @@
+"""Keyword prefilter for the classifiers.
+
+A KeywordPrefilter scans a lowercased message once per message and returns
+an int bitset with a bit per keyword found in it. Classifiers test these
+bits instead of lowercasing and re-scanning the text in every check, and use
+them to skip regexes that cannot match.
+
+The scan is a substring test per keyword rather than a single multi-pattern
+automaton: with a few dozen keywords CPython's substring search is faster
+than a trie-shaped regex alternation over the same text, and far faster
+than an automaton stepped in Python.
+"""
+from typing import Iterable
+
+
+class KeywordPrefilter:
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+        self.bits = {keyword: 1 << i for i, keyword in enumerate(self.keywords)}
+
+    def mask(self, *keywords: str) -> int:
+        """Bitmask of `keywords`; `hits & mask` is truthy if any of them was found."""
+        mask = 0
+        for keyword in keywords:
+            mask |= self.bits[keyword]
+        return mask
+
+    def scan(self, text_lower: str) -> int:
+        hits = 0
+        for keyword, bit in self.bits.items():
+            if keyword in text_lower:
+                hits |= bit
+        return hits
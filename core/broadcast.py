@@ -0,0 +1,85 @@
+"""How TgMsgHandler hands signals to the websocket subscribers.
+
+BROADCAST_MODE picks the path:
+
+  invoke     one async invoke of broadcastMessageHandler per signal (default)
+  batched    one async invoke per SQS batch carrying all of its signals
+  inprocess  post to the connections from TgMsgHandler itself, no second
+             Lambda; needs API_DOMAIN/API_STAGE and execute-api access there
+
+Every payload carries the SQS SentTimestamp of the signal so
+core.websocket logs signal-to-websocket latency the same way in all modes.
+"""
+import json
+import time
+import traceback
+from os import getenv
+from extension import get_lambda_client
+
+INVOKE = "invoke"
+BATCHED = "batched"
+INPROCESS = "inprocess"
+MODES = (INVOKE, BATCHED, INPROCESS)
+
+BROADCAST_MODE = getenv("BROADCAST_MODE", INVOKE)
+BROADCAST_FUNCTION_NAME = getenv("BROADCAST_FUNCTION_NAME", "tg-signal-service-prod-broadcastMessageHandler")
+
+
+def invoke(body):
+    get_lambda_client().invoke(
+        FunctionName=BROADCAST_FUNCTION_NAME,
+        InvocationType='Event',
+        Payload=json.dumps({'body': body}).encode("utf-8"),
+    )
+
+
+class Broadcasts:
+    """Signals to broadcast during one SQS batch.
+
+    invoke and inprocess send on `add`, batched holds them until `flush`
+    at the end of the batch. `source` is whatever the caller needs to know
+    which signals a failed flush did not deliver.
+    """
+
+    def __init__(self, mode=None):
+        self.mode = mode or BROADCAST_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"BROADCAST_MODE must be one of {MODES}, got {self.mode!r}")
+        self.pending = []
+        self.sources = []
+
+    def add(self, message, sent_at=None, source=None):
+        """Returns True when sent, False when held for `flush`."""
+        if self.mode == INVOKE:
+            invoke({'message': message, 'sent_at': sent_at})
+        elif self.mode == INPROCESS:
+            # Imported here so invoke/batched containers never load it
+            from core import websocket
+            # Like an Event invoke, a failed broadcast must not fail the
+            # record: its retry would post the signal to Telegram again
+            try:
+                websocket.broadcast(message, sent_at)
+            except Exception as e:
+                print("broadcast failed : ", e)
+                print(traceback.format_exc())
+        else:
+            self.pending.append({'message': message, 'sent_at': sent_at})
+            self.sources.append(source)
+            return False
+        return True
+
+    def flush(self):
+        """Send the held signals in one invoke, returns their sources.
+
+        Raises if the invoke fails; `sources` then still lists what was
+        not delivered.
+        """
+        if not self.pending:
+            return []
+        started = time.perf_counter()
+        invoke({'messages': self.pending})
+        print(f"broadcast {len(self.pending)} signals in one invoke ({(time.perf_counter() - started) * 1000:.0f} ms)")
+        sent = self.sources
+        self.pending = []
+        self.sources = []
+        return sent
@@ -0,0 +1,41 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire `ttl` seconds after being set.
+
+    Lives in module globals so it survives across invocations of a warm
+    Lambda container. Not thread-safe, handlers run one event at a time.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.items.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.items[key]
+            self.misses += 1
+            return None
+        self.items.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        self.items[key] = (time.monotonic() + self.ttl, value)
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        self.items.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self.items), "hits": self.hits, "misses": self.misses}
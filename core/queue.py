@@ -1,210 +1,510 @@
 import json
-from dynamodb_json import json_util
+import time
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from os import getenv
+from async_telegram import RateLimitedTelegram
 from classifiers import ForexSignalProcessor
-from extension import dynamodb, TO_CHANNEL_FOREX, TO_CHANNEL_CRYPTO, Telegram, TG_SIGNAL_BOT_TOKEN, lambda_client
+from core.broadcast import Broadcasts
+from core.cache import TTLCache
+from extension import TO_CHANNEL_FOREX, TO_CHANNEL_CRYPTO, TG_SIGNAL_BOT_TOKEN, get_lambda_client
+from storage import get_storage
 import utils
 
-processor = ForexSignalProcessor()
-telegram_bot = Telegram(token=TG_SIGNAL_BOT_TOKEN)
+# Recent telegram_msgs rows by (chat_id, msg_id), so EDITED/DELETED events
+# in a warm container skip the get_item. Kept short: another container may
+# have edited the same row meanwhile.
+TELEGRAM_MSGS_CACHE_SIZE = int(getenv("TELEGRAM_MSGS_CACHE_SIZE", 2048))
+TELEGRAM_MSGS_CACHE_TTL = float(getenv("TELEGRAM_MSGS_CACHE_TTL", 60))
+telegram_msgs_cache = TTLCache(TELEGRAM_MSGS_CACHE_SIZE, TELEGRAM_MSGS_CACHE_TTL)
 
+DELIVERY_WRITERS = 8
+# The post's to_msg_id is what TP/SL/EDITED in other invocations reply to
+POSTED_WRITE_ATTEMPTS = 3
 
-def handler(event, context):
-    print("---RECORDS---\n", event['Records'])
-    for record in event['Records']:
-        message_body = record['body']
-        
-        try:
-            message = json.loads(message_body)
-            
-            chat_id = message['chat_id']
-            msg_id = message['msg_id']
-            msg_date = message['msg_date']
-            msg_text = message.get('msg_text', "")
-            reply_msg_id = message['reply_msg_id']
-            msg_type = message.get("msg_type", "NEW")
-            signal_type = message['signal_type']
-            TO_CHANNEL_ID = TO_CHANNEL_FOREX if signal_type == "forex" else TO_CHANNEL_CRYPTO
-            if chat_id in [-1002643902459, -1002587201256]: # plus demo
-                TO_CHANNEL_ID = -1002665107295
-            if chat_id in [-1003006608856]: # sanchir
-                TO_CHANNEL_ID = -1002665107295
-            if chat_id == -1001150362511: # fx gold killer
-                TO_CHANNEL_ID = -1002665107295
-            # if chat_id == -1001717291385: # gold trading tfe
-            #     TO_CHANNEL_ID = -1002665107295
-                
-            prev_msg = None
-
-            result = processor.process_message(message)
-            print("RAW MSG -- \n", message, "\n")
-            print("RESULT -- \n", result, "\n")
-
-            if msg_type == "NEW":
-                dynamodb.put_item(
-                    TableName="telegram_msgs",
-                    Item=json_util.dumps({
-                        "chat_id": chat_id,
-                        "msg_id": msg_id,
-                        "reply_msg_id": reply_msg_id,
-                        "text": msg_text,
-                        "action": result["action"],
-                        "created_at": msg_date,
-                        "result": result,
-                    }, True)
-                )
-            elif msg_type == "EDITED":
-                prev_msg = json_util.loads(dynamodb.get_item(
-                    TableName="telegram_msgs",
-                    Key=json_util.dumps({"chat_id": chat_id, "msg_id": msg_id}, True),
-                ).get("Item", None), True)
-                print("prev_msg : ", prev_msg)
-
-                dynamodb.update_item(
-                    TableName="telegram_msgs",
-                    Key=json_util.dumps({"chat_id": chat_id, "msg_id": msg_id}, True),
-                    UpdateExpression="SET #text = :text, #action = :action, #updated_at = :updated_at",
-                    ExpressionAttributeNames={
-                        "#text": "text",
-                        "#action": "action",
-                        "#updated_at": "updated_at",
-                    },
-                    ExpressionAttributeValues=json_util.dumps({
-                        ":text": msg_text,
-                        ":action": result["action"],
-                        ":updated_at": msg_date,
-                    }, True),
-                )
-            elif msg_type == "DELETED":
-                prev_msg = json_util.loads(dynamodb.get_item(
-                    TableName="telegram_msgs",
-                    Key=json_util.dumps({"chat_id": chat_id, "msg_id": msg_id}, True),
-                ).get("Item", None), True)
-                print("prev_msg to delete : ", prev_msg)
-                # if prev_msg:
-                #     prev_order = json_util.loads(dynamodb.get_item(
-                #         TableName="orders",
-                #         Key=json_util.dumps({
-                #             "order_id": prev_msg['result']['order_id']
-                #         }, True)
-                #     ).get("Item", None), True)
-                #     delete_resp = telegram_bot.delete_message(prev_order["to_chat_id"], prev_order["to_msg_id"])
-                #     print("delete_resp ", delete_resp)
-                return
-
-            if result['action'] == 'OTHER':
-                return
-
-            to_reply_id = None
-            if result['action'] == 'NEW_SIGNAL':
-                dynamodb.put_item(
-                    TableName="orders",
-                    Item=json_util.dumps({
-                        "order_id": result["order_id"],
-                        "status": "PENDING",
-                        "chat_id": chat_id,
-
-                        "pair": result["pair"],
-                        "side": result["side"],
-                        "type": result["type"],
-                        "entry": result["entry"],
-                        "stop_loss": result.get("stop_loss"),
-                        "take_profit": result.get("take_profit"),
-                        "leverage": result.get("leverage"),
-                        "pnl": 0,
-                        "created_at": msg_date,
-                        "updated_at": "",
-                        "extracted": result,
-                    }, True),
-                    ConditionExpression="attribute_not_exists(order_id)",
-                )
-                message = telegram_bot.make_entry_message(result)
-            elif result['action'] in ['TP_HIT', 'SL_HIT', 'CANCELLED', 'IN_PROFIT_UPDATE']:
-                update_res = dynamodb.update_item(
-                    TableName="orders",
-                    Key={"order_id": {"S": result["order_id"]}},
-                    UpdateExpression="SET #status = :status, #updated_at = :updated_at",
-                    ExpressionAttributeNames={
-                        "#status": "status",
-                        "#updated_at": "updated_at",
-                    },
-                    ExpressionAttributeValues=json_util.dumps({
-                        ":status": result["action"],
-                        ":updated_at": msg_date,
-                    }, True),
-                    ReturnValues="ALL_NEW",
+TELEGRAM = "telegram"
+TRADE = "trade"
+BROADCAST = "broadcast"
+DELIVERY_STEPS = (TELEGRAM, TRADE, BROADCAST)
+
+
+def load_classifier_routes():
+    """chat_id -> classifier name for every signal_channels row that has one."""
+    return get_storage().channels.classifier_routes()
+
+
+processor = ForexSignalProcessor(route_loader=load_classifier_routes)
+# Per-chat and bot-wide Bot API limits, 429s retried after retry_after
+telegram_bot = RateLimitedTelegram(token=TG_SIGNAL_BOT_TOKEN)
+# Rate-limit waits stop this long before the Lambda timeout, leaving time
+# for the last post (10s HTTP timeout) and the end-of-batch writes
+SEND_DEADLINE_MARGIN = float(getenv("SEND_DEADLINE_MARGIN", 15))
+
+
+def get_to_channel_id(chat_id, signal_type):
+    to_channel_id = TO_CHANNEL_FOREX if signal_type == "forex" else TO_CHANNEL_CRYPTO
+    if chat_id in [-1002643902459, -1002587201256]: # plus demo
+        to_channel_id = -1002665107295
+    if chat_id in [-1003006608856]: # sanchir
+        to_channel_id = -1002665107295
+    if chat_id == -1001150362511: # fx gold killer
+        to_channel_id = -1002665107295
+    # if chat_id == -1001717291385: # gold trading tfe
+    #     to_channel_id = -1002665107295
+    return to_channel_id
+
+
+def classify_record(record):
+    """Parse one SQS record and run it through the classifiers.
+
+    Returns None for messages no classifier understood.
+    """
+    message = json.loads(record['body'])
+    result = processor.process_message(message)
+    print("RAW MSG -- \n", message, "\n")
+    print("RESULT -- \n", result, "\n")
+    if result is None:
+        return None
+    return {
+        "message": message,
+        "result": result,
+        "msg_type": message.get("msg_type", "NEW"),
+        "to_channel_id": get_to_channel_id(message['chat_id'], message['signal_type']),
+        "sent_at": record.get('attributes', {}).get('SentTimestamp'),
+    }
+
+
+def telegram_msg_row(signal):
+    """telegram_msgs audit row of a NEW message."""
+    message = signal["message"]
+    return {
+        "chat_id": message["chat_id"],
+        "msg_id": message["msg_id"],
+        "reply_msg_id": message["reply_msg_id"],
+        "text": message.get("msg_text", ""),
+        "action": signal["result"]["action"],
+        "created_at": message["msg_date"],
+        "result": signal["result"],
+    }
+
+
+def writes_in_transaction(signal):
+    """NEW signals store their audit row together with the order."""
+    return signal["msg_type"] == "NEW" and signal["result"]["action"] == "NEW_SIGNAL"
+
+
+def write_telegram_msgs(signals):
+    """Store the raw-message audit rows of NEW messages in as few round trips
+    as the backend allows. Returns the (chat_id, msg_id) keys that could
+    still not be written.
+    """
+    items = {}
+    for signal in signals:
+        message = signal["message"]
+        # A batch may not contain the same key twice, keep the latest delivery
+        items[(message["chat_id"], message["msg_id"])] = telegram_msg_row(signal)
+
+    unprocessed = get_storage().messages.put_many(items.values()) if items else set()
+    if unprocessed:
+        print("telegram_msgs unprocessed after retries : ", unprocessed)
+    for key, row in items.items():
+        if key not in unprocessed:
+            telegram_msgs_cache.set(key, row)
+    return unprocessed
+
+
+def get_telegram_msg(chat_id, msg_id):
+    """telegram_msgs row of a message, from the warm cache when possible."""
+    row = telegram_msgs_cache.get((chat_id, msg_id))
+    if row is None:
+        row = get_storage().messages.get(chat_id, msg_id)
+        if row is not None:
+            telegram_msgs_cache.set((chat_id, msg_id), row)
+    return row
+
+
+class DeferredDeliveries:
+    """Delivery progress of the orders created or resumed during one batch.
+
+    A NEW_SIGNAL is delivered in steps (DELIVERY_STEPS): the Telegram post,
+    the trade handler invoke and the websocket broadcast. Each order keeps
+    the steps done so far in `delivered`, so a record that fails half way
+    resumes on redelivery instead of being dropped as a duplicate.
+
+    The Telegram post is recorded with its to_chat_id/to_msg_id right
+    after it succeeds (`posted`): a Lambda that times out or crashes later
+    in the batch must not post it again on redelivery, and updates handled
+    by other invocations need to_msg_id to reply to. Only the trailing
+    steps are written together at the end of the batch instead of one
+    update_item each.
+    """
+
+    def __init__(self):
+        self.orders = {}
+
+    def track(self, order_id, delivered=()):
+        """Start from the stored steps unless the order was seen earlier in the batch."""
+        if order_id not in self.orders:
+            self.orders[order_id] = {"delivered": list(delivered), "changed": False}
+
+    def delivered(self, order_id):
+        return self.orders[order_id]["delivered"]
+
+    def done(self, order_id, step, to_chat_id=None, to_msg_id=None):
+        order = self.orders[order_id]
+        order["delivered"].append(step)
+        order["changed"] = True
+        if to_msg_id is not None:
+            order.update(to_chat_id=to_chat_id, to_msg_id=to_msg_id)
+
+    def posted(self, order_id, to_chat_id, to_msg_id):
+        """Store the TELEGRAM step and the post now, retried with backoff.
+
+        If every attempt fails the flush tries once more, and `to_msg_id`
+        still serves the post to replies in this batch.
+        """
+        self.done(order_id, TELEGRAM, to_chat_id, to_msg_id)
+        order = self.orders[order_id]
+        for attempt in range(POSTED_WRITE_ATTEMPTS):
+            if attempt:
+                time.sleep(0.05 * 2 ** attempt)
+            try:
+                get_storage().orders.record_delivery(order_id, list(order["delivered"]), to_chat_id, to_msg_id)
+            except Exception as e:
+                print("posted update failed : ", order_id, e)
+                continue
+            order["changed"] = False
+            return
+        print("posted update failed after retries, retrying at end of batch : ", order_id)
+
+    def to_msg_id(self, order_id):
+        return self.orders.get(order_id, {}).get("to_msg_id")
+
+    def flush(self):
+        """Write all progress concurrently, returns the order_ids that failed."""
+        changed = {order_id: order for order_id, order in self.orders.items() if order["changed"]}
+        self.orders = {}
+        if not changed:
+            return []
+        failed = []
+        with ThreadPoolExecutor(max_workers=min(DELIVERY_WRITERS, len(changed))) as pool:
+            futures = {
+                order_id: pool.submit(
+                    get_storage().orders.record_delivery,
+                    order_id, order["delivered"], order.get("to_chat_id"), order.get("to_msg_id"),
                 )
-                print("update_res : ", update_res)
-                to_reply_id = json_util.loads(update_res["Attributes"], True)["to_msg_id"]
-                if result['action'] == 'TP_HIT':
-                    message = telegram_bot.make_tp_message(result)
-                elif result['action'] == 'SL_HIT':
-                    message = telegram_bot.make_sl_message(result)
-                elif result['action'] == 'CANCELLED':
-                    message = telegram_bot.make_cancel_message(result)
-                elif result['action'] == 'IN_PROFIT_UPDATE':
-                    message = telegram_bot.make_in_profit_update_message(result)
+                for order_id, order in changed.items()
+            }
+        for order_id, future in futures.items():
+            if future.exception() is not None:
+                print("delivery update failed : ", order_id, future.exception())
+                failed.append(order_id)
+        return failed
+
+
+def put_order(order, audit_row=None):
+    """Conditionally create an order, together with its audit row if given.
 
+    Returns None when created, otherwise the order already stored (SQS
+    redelivery).
+    """
+    existing = get_storage().orders.create(order, audit_row)
+    if existing is not None:
+        return existing
+    if audit_row is not None:
+        telegram_msgs_cache.set((audit_row["chat_id"], audit_row["msg_id"]), audit_row)
+    return None
+
+
+def process_signal(signal, deliveries: DeferredDeliveries, broadcasts: Broadcasts):
+    """Apply the order-state transition for one classified message."""
+    message = signal["message"]
+    result = signal["result"]
+    msg_type = signal["msg_type"]
+    TO_CHANNEL_ID = signal["to_channel_id"]
+    chat_id = message['chat_id']
+    msg_id = message['msg_id']
+    msg_date = message['msg_date']
+    msg_text = message.get('msg_text', "")
+
+    prev_msg = None
+
+    if msg_type == "EDITED":
+        prev_msg = get_telegram_msg(chat_id, msg_id)
+        print("prev_msg : ", prev_msg)
+
+        get_storage().messages.update_text(chat_id, msg_id, msg_text, result["action"], msg_date)
+        # Mirror the update (an upsert when the row was missing)
+        telegram_msgs_cache.set((chat_id, msg_id), {
+            **(prev_msg or {"chat_id": chat_id, "msg_id": msg_id}),
+            "text": msg_text,
+            "action": result["action"],
+            "updated_at": msg_date,
+        })
+    elif msg_type == "DELETED":
+        prev_msg = get_telegram_msg(chat_id, msg_id)
+        print("prev_msg to delete : ", prev_msg)
+        # if prev_msg:
+        #     prev_order = json_util.loads(dynamodb.get_item(
+        #         TableName="orders",
+        #         Key=json_util.dumps({
+        #             "order_id": prev_msg['result']['order_id']
+        #         }, True)
+        #     ).get("Item", None), True)
+        #     delete_resp = telegram_bot.delete_message(prev_order["to_chat_id"], prev_order["to_msg_id"])
+        #     print("delete_resp ", delete_resp)
+        return
+
+    if result['action'] == 'OTHER':
+        return
+
+    to_reply_id = None
+    existing = None
+    if result['action'] == 'NEW_SIGNAL':
+        existing = put_order({
+            "order_id": result["order_id"],
+            "status": "PENDING",
+            "chat_id": chat_id,
+
+            "pair": result["pair"],
+            "side": result["side"],
+            "type": result["type"],
+            "entry": result["entry"],
+            "stop_loss": result.get("stop_loss"),
+            "take_profit": result.get("take_profit"),
+            "leverage": result.get("leverage"),
+            "pnl": 0,
+            "created_at": msg_date,
+            "updated_at": "",
+            "extracted": result,
+            "delivered": [],
+        }, audit_row=telegram_msg_row(signal) if writes_in_transaction(signal) else None)
+        if existing is not None and "delivered" not in existing:
+            # Stored before delivery steps were tracked, it went out then
+            print("Order already exists, skipping duplicate : ", result["order_id"])
+            return
+        deliveries.track(result["order_id"], existing["delivered"] if existing else ())
+        text = telegram_bot.make_entry_message(result)
+    elif result['action'] in ['TP_HIT', 'SL_HIT', 'CANCELLED', 'IN_PROFIT_UPDATE']:
+        order = get_storage().orders.update_status(result["order_id"], result["action"], msg_date)
+        print("updated order : ", order)
+        # The signal may have been posted earlier in this batch
+        to_reply_id = order.get("to_msg_id") or deliveries.to_msg_id(result["order_id"])
+        if result['action'] == 'TP_HIT':
+            text = telegram_bot.make_tp_message(result)
+        elif result['action'] == 'SL_HIT':
+            text = telegram_bot.make_sl_message(result)
+        elif result['action'] == 'CANCELLED':
+            text = telegram_bot.make_cancel_message(result)
+        elif result['action'] == 'IN_PROFIT_UPDATE':
+            text = telegram_bot.make_in_profit_update_message(result)
+
+    should_send = False
+    if result['action'] == "NEW_SIGNAL" and msg_type != "EDITED":
+        should_send = True
+    elif result['action'] in ["TP_HIT", "SL_HIT"]:
+        if prev_msg and prev_msg['action'] in ["TP_HIT", "SL_HIT"]:
             should_send = False
-            if result['action'] == "NEW_SIGNAL" and msg_type != "EDITED":
-                should_send = True
-            elif result['action'] in ["TP_HIT", "SL_HIT"]:
-                if prev_msg and prev_msg['action'] in ["TP_HIT", "SL_HIT"]:
-                    should_send = False
-                else:
-                    # No previous message, safe to send
-                    should_send = True
-            elif result['action'] in ["CANCELLED", "IN_PROFIT_UPDATE"]:
-                should_send = True
-
-            if should_send:
-                response = telegram_bot.send_message(
-                    chat_id=TO_CHANNEL_ID,
-                    text=message,
-                    reply_id=to_reply_id,
-                )
-                print("response ", response)
-                if response['ok'] and result['action'] == 'NEW_SIGNAL':
-                    to_msg_id = response['result']['message_id']
-                    dynamodb.update_item(
-                        TableName="orders",
-                        Key={"order_id": {"S": result["order_id"]}},
-                        UpdateExpression="SET to_chat_id = :to_chat_id, to_msg_id = :to_msg_id",
-                        ExpressionAttributeValues=json_util.dumps({
-                            ":to_chat_id": TO_CHANNEL_ID,
-                            ":to_msg_id": to_msg_id,
-                        }, True)
-                    )
-
-            if chat_id in [-1002587201256, -1001338521686] and result['action'] == 'NEW_SIGNAL':
-                lambda_client.invoke(
-                    # FunctionName="tg-signal-service-prod-BinanceTradeHandler",
-                    FunctionName="binance-trade-handler",
-                    InvocationType="Event",
-                    Payload=json.dumps(result).encode("utf-8"),
-                )
-            if chat_id in [-1002643902459,-1001297727353,-1003006608856, -1001717291385] and result['action'] in ['NEW_SIGNAL', 'CLOSED', 'CANCELLED', 'BREAKEVEN'] and msg_type != "EDITED":
-                lambda_client.invoke(
-                    FunctionName='tg-signal-service-prod-broadcastMessageHandler',
-                    InvocationType='Event',
-                    Payload=json.dumps({'body': {'message': result}}).encode("utf-8"),
-                )
+        else:
+            # No previous message, safe to send
+            should_send = True
+    elif result['action'] in ["CANCELLED", "IN_PROFIT_UPDATE"]:
+        should_send = True
+
+    steps = []
+    if should_send:
+        steps.append(TELEGRAM)
+    if chat_id in [-1002587201256, -1001338521686] and result['action'] == 'NEW_SIGNAL':
+        steps.append(TRADE)
+    if chat_id in [-1002643902459,-1001297727353,-1003006608856, -1001717291385] and result['action'] in ['NEW_SIGNAL', 'CLOSED', 'CANCELLED', 'BREAKEVEN'] and msg_type != "EDITED":
+        steps.append(BROADCAST)
+    if existing is not None:
+        # Progress made earlier in this batch is not stored yet
+        steps = [step for step in steps if step not in deliveries.delivered(result["order_id"])]
+        if not steps:
+            # SQS redelivery of a signal that went out completely
+            print("Order already exists, skipping duplicate : ", result["order_id"])
+            return
+        print("Resuming order delivery : ", result["order_id"], steps)
+
+    if TELEGRAM in steps:
+        response = telegram_bot.send_message(
+            chat_id=TO_CHANNEL_ID,
+            text=text,
+            reply_id=to_reply_id,
+        )
+        print("response ", response)
+        if response.get('error_code') == 429:
+            # Still limited after the retries: fail the record so SQS
+            # redelivers it and the post is resumed, not lost
+            raise RuntimeError(f"Telegram rate limit, retry after {response.get('parameters', {}).get('retry_after')}s")
+        if response['ok'] and result['action'] == 'NEW_SIGNAL':
+            deliveries.posted(result["order_id"], TO_CHANNEL_ID, response['result']['message_id'])
+
+    if TRADE in steps:
+        get_lambda_client().invoke(
+            # FunctionName="tg-signal-service-prod-BinanceTradeHandler",
+            FunctionName="binance-trade-handler",
+            InvocationType="Event",
+            Payload=json.dumps(result).encode("utf-8"),
+        )
+        deliveries.done(result["order_id"], TRADE)
+    if BROADCAST in steps:
+        # Batched mode holds it, the handler marks it done after the flush
+        if broadcasts.add(result, signal.get("sent_at"), source=signal) and result['action'] == 'NEW_SIGNAL':
+            deliveries.done(result["order_id"], BROADCAST)
+
+
+class BatchFailures:
+    """Collects batchItemFailures for SQS partial batch responses.
+
+    A failed record also fails every later record of the same FIFO
+    MessageGroupId so that per-channel ordering survives the retry.
+    """
+
+    def __init__(self):
+        self.failed = {}
+        self.first_failure = {}
+
+    @staticmethod
+    def group_id(record):
+        return record.get('attributes', {}).get('MessageGroupId') or record['messageId']
+
+    def fail(self, index, record):
+        self.failed[index] = record['messageId']
+        group_id = self.group_id(record)
+        self.first_failure[group_id] = min(index, self.first_failure.get(group_id, index))
 
+    def is_blocked(self, index, record):
+        """True if the record already failed or follows a failure in its group."""
+        if index in self.failed:
+            return True
+        first = self.first_failure.get(self.group_id(record))
+        if first is not None and first < index:
+            self.failed[index] = record['messageId']
+            return True
+        return False
+
+    def response(self):
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": message_id}
+                for _, message_id in sorted(self.failed.items())
+            ],
+        }
+
+
+def handler(event, context):
+    print("---RECORDS---\n", event['Records'])
+    failures = BatchFailures()
+
+    # 1. classify every record
+    signals = []
+    for index, record in enumerate(event['Records']):
+        if failures.is_blocked(index, record):
+            continue
+        try:
+            signal = classify_record(record)
         except json.JSONDecodeError as e:
-            print(f"Failed to decode message body: {message_body} due to {str(e)}")
+            print(f"Failed to decode message body: {record['body']} due to {str(e)}")
+            failures.fail(index, record)
             continue
         except Exception as e:
             print(e)
-            traceback_str = traceback.format_exc()
-            print(traceback_str)
+            print(traceback.format_exc())
+            failures.fail(index, record)
             continue
-    
-    return {
-        "success": True,
+        if signal is not None:
+            signals.append((index, record, signal))
+
+    # 2. raw-message audit rows in as few round trips as possible; new
+    # signals write theirs in the same transaction as the order
+    unwritten = write_telegram_msgs([
+        s for _, _, s in signals if s["msg_type"] == "NEW" and not writes_in_transaction(s)
+    ])
+    for index, record, signal in signals:
+        message = signal["message"]
+        if signal["msg_type"] == "NEW" and (message["chat_id"], message["msg_id"]) in unwritten:
+            print("Audit row not written : ", message)
+            failures.fail(index, record)
+
+    # 3. order-state transitions, in record order. A record whose send would
+    # wait out the invocation fails (DeadlineExceeded) and is retried by SQS.
+    telegram_bot.set_deadline(
+        context.get_remaining_time_in_millis() / 1000 - SEND_DEADLINE_MARGIN if context else None
+    )
+    deliveries = DeferredDeliveries()
+    broadcasts = Broadcasts()
+    for index, record, signal in signals:
+        if failures.is_blocked(index, record):
+            print("Skipping, earlier failure in group : ", record['messageId'])
+            continue
+        try:
+            process_signal(signal, deliveries, broadcasts)
+        except Exception as e:
+            print(e)
+            print(traceback.format_exc())
+            failures.fail(index, record)
+
+    # 4. batched mode: every websocket broadcast of the batch in one invoke,
+    # before the progress below so BROADCAST is only stored once it went out
+    try:
+        sent = broadcasts.flush()
+    except Exception as e:
+        print("broadcast failed : ", e)
+        print(traceback.format_exc())
+        # Their retry resumes the broadcast
+        for index, record, signal in signals:
+            if any(signal is source for source in broadcasts.sources):
+                failures.fail(index, record)
+        # Keep FIFO order: later records of those groups are retried too
+        for index, record in enumerate(event['Records']):
+            failures.is_blocked(index, record)
+    else:
+        for signal in sent:
+            if signal["result"]["action"] == "NEW_SIGNAL":
+                deliveries.done(signal["result"]["order_id"], BROADCAST)
+
+    # 5. trailing delivery progress, also of records that failed so their
+    # retry resumes. The posts are out already, so a failure here is logged.
+    deliveries.flush()
+
+    response = failures.response()
+    print("batchItemFailures : ", response["batchItemFailures"])
+    print("telegram_msgs cache : ", telegram_msgs_cache.stats())
+    return response
+
+
+def dead_letter_row(record):
+    """dead_letters row of a TgMsgFifoDLQ record."""
+    attributes = record.get('attributes', {})
+    row = {
+        "message_id": record['messageId'],
+        "group_id": attributes.get('MessageGroupId'),
+        "body": record['body'],
+        "receive_count": int(attributes.get('ApproximateReceiveCount', 0)),
+        "first_received_at": int(attributes.get('ApproximateFirstReceiveTimestamp', 0)),
+        "dead_at": int(time.time() * 1000),
     }
+    try:
+        message = json.loads(record['body'])
+        row.update(chat_id=message.get('chat_id'), msg_id=message.get('msg_id'))
+    except (json.JSONDecodeError, AttributeError):
+        pass
+    return row
 
 
 def dead_letter_handler(event, context):
-    for record in event['Records']:
-        message_body = record['body']
-        print("Dead message body : ", message_body)
\ No newline at end of file
+    """Keep TgMsgFifoQueue records that ran out of receives in dead_letters,
+    with their group and body, so they can be inspected and re-sent.
+
+    A record that could not be stored is reported back and stays in the DLQ.
+    """
+    rows = [dead_letter_row(record) for record in event['Records']]
+    for row in rows:
+        print(f"DEAD LETTER {row['message_id']} group={row['group_id']} chat_id={row.get('chat_id')} "
+              f"msg_id={row.get('msg_id')} receives={row['receive_count']}")
+    unwritten = get_storage().dead_letters.put_many(rows)
+    if unwritten:
+        print("dead_letters unprocessed after retries : ", unwritten)
+    return {"batchItemFailures": [{"itemIdentifier": message_id} for message_id in sorted(unwritten)]}
\ No newline at end of file
@@ -1,19 +1,30 @@
 import json
-from dynamodb_json import json_util
-from extension import dynamodb
-from extension import apigw_client, API_DOMAIN, API_STAGE
-import boto3
-import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.cache import TTLCache
+from extension import get_apigw_client, APIGW_POOL_MAXSIZE
 import os
+from storage import get_storage
+
+# Concurrent post_to_connection calls per broadcast, one pooled connection each
+BROADCAST_CONCURRENCY = APIGW_POOL_MAXSIZE
+
+# Subscriber connection_ids per channel (None = everyone) with the
+# connections version they were read at. Bursts of broadcasts (NEW_SIGNAL
+# then CANCELLED) then cost one version read instead of a query each;
+# connect/disconnect bump the version, the TTL bounds anything missed.
+SUBSCRIBERS_CACHE_SIZE = int(os.getenv("SUBSCRIBERS_CACHE_SIZE", 256))
+SUBSCRIBERS_CACHE_TTL = float(os.getenv("SUBSCRIBERS_CACHE_TTL", 30))
+# The GSIs are eventually consistent: until this long after a version was
+# first seen, queries may still miss its connects and are not served from
+# the cache
+SUBSCRIBERS_SETTLE = float(os.getenv("SUBSCRIBERS_SETTLE", 1))
+subscribers_cache = TTLCache(SUBSCRIBERS_CACHE_SIZE, SUBSCRIBERS_CACHE_TTL)
 
 
 def handler(event, context):
-    domain = event['requestContext']['domainName']
-    stage = event['requestContext']['stage']
     connection_id = event['requestContext']['connectionId']
-
-    apigw = boto3.client('apigatewaymanagementapi',
-                         endpoint_url=f"https://{domain}/{stage}")
+    apigw_client = get_apigw_client()
 
     body = json.loads(event['body'])
     message = body.get('message', 'Hello!')
@@ -33,15 +44,18 @@ def connect_handler(event, context):
     
     connection_id = event['requestContext']['connectionId']
     
-    dynamodb.put_item(
-        TableName="websocket_connections",
-        Item=json_util.dumps({
-            "connection_id": connection_id,
-            "status": 1,
-            "channel_id": channel_id,
-            "connected_at": event['requestContext']['requestTimeEpoch']
-        }, True)
-    )
+    connection = {
+        "connection_id": connection_id,
+        "status": 1,
+        "connected_at": event['requestContext']['requestTimeEpoch']
+    }
+    # channel_id is an index key and can't be NULL; without one the
+    # connection only gets broadcasts meant for everyone
+    if channel_id:
+        connection["channel_id"] = channel_id
+    connections = get_storage().connections
+    connections.put(connection)
+    connections.bump_version()
     
     return {
         "statusCode": 200,
@@ -52,10 +66,7 @@ def connect_handler(event, context):
 def disconnect_handler(event, context):
     connection_id = event['requestContext']['connectionId']
     
-    dynamodb.delete_item(
-        TableName="websocket_connections",
-        Key=json_util.dumps({"connection_id": connection_id}, True)
-    )
+    remove_connections([connection_id])
     
     return {
         "statusCode": 200,
@@ -63,63 +74,105 @@ def disconnect_handler(event, context):
     }
 
 
-def send_message_to_all_connections(message):
-    connections = json_util.loads(dynamodb.query(
-        TableName="websocket_connections",
-        IndexName="status-connected_at-index",
-        KeyConditionExpression="#status = :status",
-        ExpressionAttributeNames={
-            '#status': 'status'
-        },
-        ExpressionAttributeValues=json_util.dumps({
-            ":status": 1,
-        }, True),
-        ProjectionExpression="connection_id"
-    ).get('Items', []), True)
-    
-    for connection in connections:
-        connection_id = connection['connection_id']
+def post_to_connections(connection_ids, data: bytes):
+    """POST one already-serialised payload to many connections concurrently.
+
+    Connections API Gateway reports as gone are deleted afterwards in one
+    batch. Returns (sent, gone, failed) counts.
+    """
+    apigw_client = get_apigw_client()
+
+    def post(connection_id):
         try:
-            apigw_client.post_to_connection(ConnectionId=connection_id,
-                                      Data=json.dumps({'message': message}).encode('utf-8'))
+            apigw_client.post_to_connection(ConnectionId=connection_id, Data=data)
+            return "sent"
+        except apigw_client.exceptions.GoneException:
+            return "gone"
         except Exception as e:
             print(f"Failed to send message to {connection_id}: {e}")
+            return "failed"
+
+    connection_ids = list(connection_ids)
+    if not connection_ids:
+        return 0, 0, 0
+    with ThreadPoolExecutor(max_workers=min(BROADCAST_CONCURRENCY, len(connection_ids))) as pool:
+        outcomes = list(pool.map(post, connection_ids))
+
+    gone = [connection_id for connection_id, outcome in zip(connection_ids, outcomes) if outcome == "gone"]
+    if gone:
+        remove_connections(gone)
+    sent, failed = outcomes.count("sent"), outcomes.count("failed")
+    print(f"broadcast to {len(connection_ids)} connections: {sent} sent, {len(gone)} gone, {failed} failed")
+    return sent, len(gone), failed
+
+
+def remove_connections(connection_ids):
+    connections = get_storage().connections
+    if len(connection_ids) == 1:
+        connections.delete(connection_ids[0])
+    else:
+        connections.delete_many(connection_ids)
+    connections.bump_version()
+
+
+def get_subscribers(channel_id=None):
+    """connection_ids subscribed to channel_id, or of every connection."""
+    connections = get_storage().connections
+    # Read (consistently) before the query, so a connect after this read
+    # bumps the version past the cached one
+    version = connections.version()
+    now = time.monotonic()
+    # (version, connection_ids, when the version was first seen, read after it settled)
+    cached = subscribers_cache.get(channel_id)
+    if cached is not None and cached[0] == version:
+        if cached[3]:
+            return cached[1]
+        seen_at = cached[2]
+    else:
+        seen_at = now
+    # The GSI query itself can lag the connect that bumped the version, so
+    # a result read soon after a version change is used once but not
+    # served from the cache: later calls query again until it has settled
+    found = connections.for_channel(channel_id) if channel_id else connections.active()
+    connection_ids = [c['connection_id'] for c in found]
+    settled = now - seen_at >= SUBSCRIBERS_SETTLE
+    subscribers_cache.set(channel_id, (version, connection_ids, seen_at, settled))
+    return connection_ids
+
+
+def send_message_to_all_connections(message):
+    return post_to_connections(get_subscribers(), json.dumps({'message': message}).encode('utf-8'))
 
 
 def send_message_to_connections(channel_id, message):
-    connections = json_util.loads(dynamodb.query(
-        TableName="websocket_connections",
-        IndexName="status-connected_at-index",
-        KeyConditionExpression="#status = :status",
-        ExpressionAttributeNames={
-            '#status': 'status'
-        },
-        ExpressionAttributeValues=json_util.dumps({
-            ":status": 1,
-        }, True),
-        ProjectionExpression="connection_id, channel_id"
-    ).get('Items', []), True)
-
-    for connection in connections:
-        if connection['channel_id'] == channel_id:
-            connection_id = connection['connection_id']
-            try:
-                apigw_client.post_to_connection(ConnectionId=connection_id, Data=json.dumps({'message': message}).encode('utf-8'))
-            except Exception as e:
-                print(f"Failed to send message to {connection_id}: {e}")
+    return post_to_connections(get_subscribers(channel_id), json.dumps({'message': message}).encode('utf-8'))
 
 
-def broadcast_message(event, context):
-    body = event['body']
-    message = body.get('message', 'Hello, everyone!')
+def broadcast(message, sent_at=None):
+    """Send one signal to its channel's subscribers, or to everyone.
+
+    sent_at is the SQS SentTimestamp (ms) of the signal, for logging
+    signal-to-websocket latency.
+    """
     print("broadcast message", message)
     print("broadcast message type", type(message))
 
     channel_id = message.get('chat_id')
     if channel_id:
-        send_message_to_connections(str(channel_id), message)
+        result = send_message_to_connections(str(channel_id), message)
     else:
-        send_message_to_all_connections(message)
+        result = send_message_to_all_connections(message)
+    if sent_at:
+        print(f"signal to websocket : {time.time() * 1000 - int(sent_at):.0f} ms")
+    return result
+
+
+def broadcast_message(event, context):
+    body = event['body']
+    # core.broadcast batched mode sends every signal of an SQS batch at once
+    for item in body.get('messages') or [body]:
+        broadcast(item.get('message', 'Hello, everyone!'), item.get('sent_at'))
+    print("subscribers cache : ", subscribers_cache.stats())
     
     return {
         "statusCode": 200,
@@ -136,13 +189,14 @@ def message_handler(event, context):
     except Exception as e:
         msg = 'Invalid JSON'
 
+    apigw_client = get_apigw_client()
     try:
         apigw_client.post_to_connection(
             ConnectionId=connection_id,
             Data=json.dumps({"echo": msg}).encode('utf-8')
         )
     except apigw_client.exceptions.GoneException:
-        dynamodb.delete_item(TableName="websocket_connections", Key=json_util.dumps({'connectionId': connection_id}, True))
+        remove_connections([connection_id])
 
     return {'statusCode': 200}
 
@@ -151,12 +205,13 @@ def ping_handler(event, context):
     connection_id = event['requestContext']['connectionId']
 
     # Optionally send back a pong
+    apigw_client = get_apigw_client()
     try:
         apigw_client.post_to_connection(
             ConnectionId=connection_id,
             Data=json.dumps({"pong": True}).encode('utf-8')
         )
     except apigw_client.exceptions.GoneException:
-        dynamodb.delete_item(TableName="websocket_connections" ,Key={'connectionId': connection_id})
+        remove_connections([connection_id])
 
     return {'statusCode': 200}
\ No newline at end of file
@@ -0,0 +1,25 @@
+import json
+import os
+from typing import Dict, List, Optional
+
+CORPUS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_VERSION = "v2"
+
+
+def load(version: str = DEFAULT_VERSION, channels: Optional[List[str]] = None) -> Dict[str, List[dict]]:
+    """Load the recorded message corpus as {channel: [message, ...]}.
+
+    Each channel lives in corpus/<version>/<channel>.jsonl, one SQS message
+    body per line (the same shape signal_listener sends).
+    """
+    path = os.path.join(CORPUS_DIR, version)
+    corpus = {}
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith(".jsonl"):
+            continue
+        channel = filename[:-len(".jsonl")]
+        if channels and channel not in channels:
+            continue
+        with open(os.path.join(path, filename), encoding="utf-8") as f:
+            corpus[channel] = [json.loads(line) for line in f if line.strip()]
+    return corpus
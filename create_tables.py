@@ -1,7 +1,12 @@
-from extension import dynamodb
+"""DynamoDB table definitions.
 
+    python create_tables.py [table ...]
+
+Creates the given tables (all of them by default) through extension's
+client; AWS_ENDPOINT_URL points it at DynamoDB Local or LocalStack.
+"""
 # signal_channels
-response = dynamodb.create_table(
+SIGNAL_CHANNELS = dict(
     TableName="signal_channels",
     AttributeDefinitions=[
         {
@@ -69,7 +74,7 @@ response = dynamodb.create_table(
     Tags=[
         {
             'Key': 'Description',
-            'Value': 'signal_channels chat_id signal_type name owner status'
+            'Value': 'signal_channels chat_id signal_type name owner status classifier'
         },
     ],
     TableClass='STANDARD',
@@ -78,7 +83,7 @@ response = dynamodb.create_table(
 
 
 # telegram_msgs
-response = dynamodb.create_table(
+TELEGRAM_MSGS = dict(
     TableName="telegram_msgs",
     AttributeDefinitions=[
         {
@@ -113,7 +118,7 @@ response = dynamodb.create_table(
 
 
 # orders
-response = dynamodb.create_table(
+ORDERS = dict(
     TableName="orders",
     AttributeDefinitions=[
         {
@@ -178,13 +183,25 @@ response = dynamodb.create_table(
 
 
 # webscoket_connections
-response = dynamodb.create_table(
+WEBSOCKET_CONNECTIONS = dict(
     TableName="websocket_connections",
     AttributeDefinitions=[
         {
             'AttributeName': 'connection_id',
             'AttributeType': 'S'
-        }
+        },
+        {
+            'AttributeName': 'status', # 1 while connected
+            'AttributeType': 'N'
+        },
+        {
+            'AttributeName': 'connected_at',
+            'AttributeType': 'N'
+        },
+        {
+            'AttributeName': 'channel_id',
+            'AttributeType': 'S'
+        },
     ],
     KeySchema=[
         {            'AttributeName': 'connection_id',
@@ -208,11 +225,28 @@ response = dynamodb.create_table(
             'Projection': {
                 'ProjectionType': 'ALL'
             }
+        },
+        {
+            # Subscribers of one channel, so a broadcast doesn't read every connection
+            'IndexName': 'channel_id-status-index',
+            'KeySchema': [
+                {
+                    'AttributeName': 'channel_id',
+                    'KeyType': 'HASH',
+                },
+                {
+                    'AttributeName': 'status',
+                    'KeyType': 'RANGE'
+                }
+            ],
+            'Projection': {
+                'ProjectionType': 'KEYS_ONLY'
+            }
         }
     ],
     Tags=[
         {            'Key': 'Description',
-            'Value': 'websocket_connections connection_id'
+            'Value': 'websocket_connections connection_id status channel_id connected_at'
         },
     ],
     TableClass='STANDARD',
@@ -221,7 +255,7 @@ response = dynamodb.create_table(
 
 
 # binance_api_key_secrets
-response = dynamodb.create_table(
+BINANCE_API_KEY_SECRETS = dict(
     TableName='binance_api_key_secrets',
     AttributeDefinitions=[
         {
@@ -265,7 +299,7 @@ response = dynamodb.create_table(
 
 
 # forex_account_credentials
-response = dynamodb.create_table(
+FOREX_ACCOUNT_CREDENTIALS = dict(
     TableName='forex_account_credentials',
     AttributeDefinitions=[
         {
@@ -322,4 +356,56 @@ response = dynamodb.create_table(
     ],
     TableClass='STANDARD',
     DeletionProtectionEnabled=False,
-)
\ No newline at end of file
+)
+
+
+# dead_letters
+DEAD_LETTERS = dict(
+    TableName='dead_letters',
+    AttributeDefinitions=[
+        {
+            'AttributeName': 'message_id', # SQS messageId of the TgMsgFifoQueue record
+            'AttributeType': 'S'
+        },
+    ],
+    KeySchema=[
+        {
+            'AttributeName': 'message_id',
+            'KeyType': 'HASH'
+        }
+    ],
+    BillingMode='PAY_PER_REQUEST',
+    Tags=[
+        {
+            'Key': 'Description',
+            'Value': 'dead_letters message_id group_id body chat_id msg_id receive_count first_received_at dead_at',
+        },
+    ],
+    TableClass='STANDARD',
+    DeletionProtectionEnabled=False,
+)
+
+
+TABLES = [
+    SIGNAL_CHANNELS,
+    TELEGRAM_MSGS,
+    ORDERS,
+    WEBSOCKET_CONNECTIONS,
+    BINANCE_API_KEY_SECRETS,
+    FOREX_ACCOUNT_CREDENTIALS,
+    DEAD_LETTERS,
+]
+
+
+def create_tables(client, names=None):
+    for table in TABLES:
+        if names and table["TableName"] not in names:
+            continue
+        client.create_table(**table)
+        print(f"created {table['TableName']}")
+
+
+if __name__ == "__main__":
+    import sys
+    from extension import get_dynamodb
+    create_tables(get_dynamodb(), sys.argv[1:])
@@ -1,7 +1,23 @@
-from telethon.sync import TelegramClient
-from telethon.tl.types import MessageMediaPhoto, MessageMediaDocument
+"""Copy every message of one channel into another, media included.
+
+    python download.py [--source ID] [--target ID] [--concurrency 4]
+
+Downloads run ahead of the sends with bounded concurrency while messages
+are re-sent strictly in order. Media is held in memory and re-uploaded
+without touching disk; only files above --spool-mb go through a temporary
+spool file. The last copied message id is saved after every successful
+send and the copy stops at the first failed one, so a rerun resumes with
+the message that failed and the target never has gaps.
+"""
+import argparse
+import asyncio
+import io
+import json
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
+from telethon import TelegramClient
 
 load_dotenv()
 
@@ -13,25 +29,142 @@ source_chat_id = -1001972505443
 target_chat_id = -1002539120057
 
 download_path = './downloads/'
-os.makedirs(download_path, exist_ok=True)
+DOWNLOAD_CONCURRENCY = 4
+SPOOL_THRESHOLD_MB = 50
+REPORT_EVERY = 50
+
+
+class CopyState:
+    """Last copied message id for a source -> target pair, kept on disk."""
+
+    def __init__(self, source, target):
+        self.path = os.path.join(download_path, f"copy_state_{source}_{target}.json")
+        self.last_id = 0
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.last_id = json.load(f)["last_id"]
+
+    def save(self, last_id):
+        self.last_id = last_id
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"last_id": last_id}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+class Stats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.messages = 0
+        self.media = 0
+        self.spooled = 0
+        self.bytes = 0
+        self.errors = 0
+
+    def report(self, prefix="📊"):
+        elapsed = time.monotonic() - self.started
+        print(f"{prefix} {self.messages} messages ({self.media} media, {self.spooled} spooled, {self.errors} errors) "
+              f"in {elapsed:.0f}s: {self.messages / elapsed:.1f} msg/s, {self.bytes / elapsed / 1e6:.2f} MB/s")
+
+
+async def fetch_media(client, msg, spool_threshold, semaphore):
+    """Download msg's media into a named BytesIO, or a spool file when large."""
+    async with semaphore:
+        size = msg.file.size or 0
+        name = msg.file.name or f"{msg.id}{msg.file.ext or ''}"
+        if size > spool_threshold:
+            spool_dir = tempfile.mkdtemp(dir=download_path)
+            return await client.download_media(msg, file=os.path.join(spool_dir, name)), size
+        buffer = io.BytesIO()
+        await client.download_media(msg, file=buffer)
+        # Telethon picks photo vs document from the name
+        buffer.name = name
+        buffer.seek(0)
+        return buffer, buffer.getbuffer().nbytes
 
-with TelegramClient(session_name, api_id, api_hash) as client:
-    source = client.get_entity(source_chat_id)
-    target = client.get_entity(target_chat_id)
 
-    for msg in client.iter_messages(source, reverse=True):
+async def send_copy(client, target, msg, download, stats):
+    if download is None:
+        await client.send_message(target, msg.text)
+        print(f"✅ Copied text message ID {msg.id}")
+        return
+    file, size = await download
+    try:
+        await client.send_file(target, file, caption=msg.text or "")
+    finally:
+        if isinstance(file, str):
+            os.remove(file)
+            os.rmdir(os.path.dirname(file))
+            stats.spooled += 1
+    stats.media += 1
+    stats.bytes += size
+    print(f"📁 Sent media from message ID {msg.id} ({size / 1e6:.1f} MB)")
+
+
+async def copy_channel(client, source_id, target_id, concurrency, spool_threshold):
+    source = await client.get_entity(source_id)
+    target = await client.get_entity(target_id)
+    state = CopyState(source_id, target_id)
+    stats = Stats()
+    semaphore = asyncio.Semaphore(concurrency)
+    # (msg, download task or None) in message order; the bound keeps
+    # downloads at most a couple of batches ahead of the sends
+    pending = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def produce():
         try:
-            # CASE 1: Just text message
-            if msg.text and not msg.media:
-                client.send_message(target, msg.text)
-                print(f"✅ Copied text message ID {msg.id}")
-
-            # CASE 2: Photo or document with optional caption
-            elif msg.media:
-                file_path = client.download_media(msg, file=download_path)
-                if file_path:
-                    client.send_file(target, file_path, caption=msg.text or "")
-                    print(f"📁 Sent media from message ID {msg.id}")
-
-        except Exception as e:
-            print(f"❌ Error on message ID {msg.id}: {e}")
+            async for msg in client.iter_messages(source, reverse=True, min_id=state.last_id):
+                if msg.media and msg.file:
+                    await pending.put((msg, asyncio.ensure_future(fetch_media(client, msg, spool_threshold, semaphore))))
+                elif msg.text:
+                    await pending.put((msg, None))
+        finally:
+            # Also when iter_messages raises, so the sends don't wait
+            # forever; awaiting the producer then re-raises its error
+            await pending.put(None)
+
+    print(f"Copying {source_id} -> {target_id} after message ID {state.last_id}")
+    producer = asyncio.ensure_future(produce())
+    try:
+        while (item := await pending.get()) is not None:
+            msg, download = item
+            try:
+                await send_copy(client, target, msg, download, stats)
+            except Exception as e:
+                stats.errors += 1
+                print(f"❌ Error on message ID {msg.id}: {e}")
+                print(f"Stopped, rerun to resume from message ID {msg.id}")
+                return
+            stats.messages += 1
+            state.save(msg.id)
+            if stats.messages % REPORT_EVERY == 0:
+                stats.report()
+        await producer
+    finally:
+        producer.cancel()
+        # Downloads queued ahead of a stop
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not None and item[1] is not None:
+                item[1].cancel()
+        stats.report("🏁")
+
+
+def parse_args():
+    p = argparse.ArgumentParser(description="Copy a channel's messages and media into another channel")
+    p.add_argument("--source", type=int, default=source_chat_id)
+    p.add_argument("--target", type=int, default=target_chat_id)
+    p.add_argument("--concurrency", type=int, default=DOWNLOAD_CONCURRENCY, help="parallel media downloads")
+    p.add_argument("--spool-mb", dest="spool_mb", type=float, default=SPOOL_THRESHOLD_MB,
+                   help="files above this size are spooled to disk instead of memory")
+    return p.parse_args()
+
+
+async def main():
+    args = parse_args()
+    os.makedirs(download_path, exist_ok=True)
+    async with TelegramClient(session_name, api_id, api_hash) as client:
+        await copy_channel(client, args.source, args.target, args.concurrency, args.spool_mb * 1e6)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
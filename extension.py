@@ -1,7 +1,5 @@
-import boto3
 from os import getenv
 from dotenv import load_dotenv
-import requests
 
 load_dotenv()
 AWS_ACCESS_KEY = getenv("MY_AWS_ACCESS_KEY")
@@ -15,23 +13,107 @@ BINANCE_API_KEY = getenv("BINANCE_API_KEY")
 BINANCE_API_SECRET = getenv("BINANCE_API_SECRET")
 API_DOMAIN = getenv("API_DOMAIN")
 API_STAGE = getenv("API_STAGE")
+TELEGRAM_API_URL = getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# (connect, read) seconds for Bot API calls
+TELEGRAM_TIMEOUT = (3.05, 10)
+TELEGRAM_POOL_MAXSIZE = 10
+# HTTP connections of the apigatewaymanagementapi client, i.e. how many
+# websocket posts a broadcast can have in flight
+APIGW_POOL_MAXSIZE = int(getenv("APIGW_POOL_MAXSIZE", 32))
+
+# boto3 clients are created on first use, so a Lambda only pays (import
+# boto3, endpoint resolution) for the clients it actually calls. The old
+# module attributes (extension.dynamodb etc.) still work through __getattr__.
+_clients = {}
+
+
+def _client(service, **kwargs):
+    client = _clients.get(service)
+    if client is None:
+        import boto3
+        client = _clients[service] = boto3.client(
+            service, aws_access_key_id=AWS_ACCESS_KEY, aws_secret_access_key=AWS_SECRET_KEY,
+            region_name=AWS_REGION, **kwargs,
+        )
+    return client
+
+
+def get_dynamodb():
+    return _client("dynamodb")
+
+
+def get_sqs_client():
+    return _client("sqs")
+
+
+def get_lambda_client():
+    return _client("lambda")
+
+
+def get_apigw_client():
+    from botocore.config import Config
+    return _client(
+        "apigatewaymanagementapi", endpoint_url=f"https://{API_DOMAIN}/{API_STAGE}",
+        config=Config(max_pool_connections=APIGW_POOL_MAXSIZE),
+    )
+
+
+_LAZY_CLIENTS = {
+    "dynamodb": get_dynamodb,
+    "sqs_client": get_sqs_client,
+    "lambda_client": get_lambda_client,
+    "apigw_client": get_apigw_client,
+}
+
+
+def __getattr__(name):
+    if name in _LAZY_CLIENTS:
+        return _LAZY_CLIENTS[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_http_session = None
+
+
+def get_http_session() -> "requests.Session":
+    """Process-wide keep-alive session, reused across warm Lambda invocations."""
+    global _http_session
+    if _http_session is None:
+        # requests is ~140ms of import, only paid by whoever sends
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        session = requests.Session()
+        # Only connection failures are retried; a read timeout on sendMessage
+        # may already have posted the message.
+        retry = Retry(total=2, connect=2, read=0, status=0, other=0, backoff_factor=0.2)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=TELEGRAM_POOL_MAXSIZE, max_retries=retry)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _http_session = session
+    return _http_session
 
-dynamodb = boto3.client('dynamodb', aws_access_key_id=AWS_ACCESS_KEY, aws_secret_access_key=AWS_SECRET_KEY, region_name=AWS_REGION)
-sqs_client = boto3.client("sqs", aws_access_key_id=AWS_ACCESS_KEY, aws_secret_access_key=AWS_SECRET_KEY, region_name=AWS_REGION)
-lambda_client = boto3.client("lambda", aws_access_key_id=AWS_ACCESS_KEY, aws_secret_access_key=AWS_SECRET_KEY, region_name=AWS_REGION)
-apigw_client = boto3.client("apigatewaymanagementapi", endpoint_url=f"https://{API_DOMAIN}/{API_STAGE}", aws_access_key_id=AWS_ACCESS_KEY, aws_secret_access_key=AWS_SECRET_KEY, region_name=AWS_REGION)
 
 class Telegram:
-    def __init__(self, token:str):
+    def __init__(self, token:str, session: "requests.Session" = None, api_url: str = TELEGRAM_API_URL):
         self.token = token
+        self._session = session
+        self.base_url = f"{api_url}/bot{token}"
+
+    @property
+    def session(self) -> "requests.Session":
+        if self._session is None:
+            self._session = get_http_session()
+        return self._session
 
     def send_message(self, chat_id, text, reply_id=None):
-        return requests.post(f'https://api.telegram.org/bot{self.token}/sendMessage', json={
+        return self.session.post(f'{self.base_url}/sendMessage', json={
                 'chat_id': chat_id,
                 'text': text,
                 "parse_mode": "html",
                 "reply_to_message_id": reply_id,
-        }).json()
+        }, timeout=TELEGRAM_TIMEOUT).json()
     
     def make_entry_message(self, data):
         side_emoji = "📈" if data['side'] == 'BUY' else "📉"
@@ -123,10 +205,10 @@ class Telegram:
         return message
     
     def delete_message(self, chat_id, msg_id):
-        return requests.post(f'https://api.telegram.org/bot{self.token}/deleteMessage', json={
+        return self.session.post(f'{self.base_url}/deleteMessage', json={
                 'chat_id': chat_id,
                 'message_id': msg_id,
-        }).json()
+        }, timeout=TELEGRAM_TIMEOUT).json()
 
 
 SELL = 'SELL|sell|SHORT|short'
@@ -1,6 +1,10 @@
+import asyncio
 import os
+import time
+from collections import defaultdict
 from dotenv import load_dotenv
 from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError
 
 # Load environment variables
 load_dotenv()
@@ -14,28 +18,103 @@ from_channels = [
     int(channel.strip()) for channel in os.getenv("FROM_CHANNEL_IDS").split(",")
 ]
 
+# Messages of one source chat arriving within this many seconds of each
+# other are forwarded together, albums (same grouped_id) always are
+COALESCE_WINDOW = 0.5
+COALESCE_MAX_WAIT = 3
+# Telegram's limit of message ids per forward request
+MAX_FORWARD_BATCH = 100
+MAX_FLOOD_RETRIES = 3
+
 # Initialize the Telegram client
 client = TelegramClient(session_name, api_id, api_hash)
 
 
+class ForwardBatcher:
+    """Coalesces events per source chat into list forward_messages calls."""
+
+    def __init__(self, client, to_channel, window: float = COALESCE_WINDOW, max_wait: float = COALESCE_MAX_WAIT):
+        self.client = client
+        self.to_channel = to_channel
+        self.window = window
+        self.max_wait = max_wait
+        self.buffers = defaultdict(list)
+        self.last_added = {}
+        self.flushers = {}
+        # Keeps a chat's batches in order while one sits out a flood wait
+        self.locks = defaultdict(asyncio.Lock)
+
+    def add(self, message):
+        chat_id = message.chat_id
+        self.buffers[chat_id].append(message)
+        self.last_added[chat_id] = time.monotonic()
+        if chat_id not in self.flushers:
+            self.flushers[chat_id] = asyncio.ensure_future(self._flush_later(chat_id))
+
+    async def _flush_later(self, chat_id):
+        # Wait until the chat has been quiet for `window`, at most `max_wait`
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            quiet_at = self.last_added[chat_id] + self.window
+            now = time.monotonic()
+            if now >= quiet_at or now >= deadline:
+                break
+            await asyncio.sleep(min(quiet_at, deadline) - now)
+        messages = self.buffers.pop(chat_id)
+        del self.flushers[chat_id]
+        async with self.locks[chat_id]:
+            for batch in self._batches(messages):
+                await self._forward(chat_id, batch)
+
+    def _batches(self, messages):
+        """Split into <= MAX_FORWARD_BATCH chunks without splitting an album."""
+        # An edit arriving with its original forwards once, with the latest text
+        messages = sorted({m.id: m for m in messages}.values(), key=lambda m: m.id)
+        groups = []
+        for message in messages:
+            if groups and message.grouped_id and groups[-1][-1].grouped_id == message.grouped_id:
+                groups[-1].append(message)
+            else:
+                groups.append([message])
+        batch = []
+        for group in groups:
+            if batch and len(batch) + len(group) > MAX_FORWARD_BATCH:
+                yield batch
+                batch = []
+            batch += group
+        if batch:
+            yield batch
+
+    async def _forward(self, chat_id, messages):
+        for attempt in range(MAX_FLOOD_RETRIES + 1):
+            try:
+                await self.client.forward_messages(self.to_channel, messages)
+                print(f"Forwarded {len(messages)} messages from {chat_id} to {self.to_channel}")
+                return
+            except FloodWaitError as e:
+                if attempt == MAX_FLOOD_RETRIES:
+                    print(f"Giving up on {len(messages)} messages from {chat_id} after flood waits: {e}")
+                    return
+                print(f"Flood wait {e.seconds}s forwarding from {chat_id} ({attempt + 1}/{MAX_FLOOD_RETRIES})")
+                await asyncio.sleep(e.seconds)
+            except Exception as e:
+                print(f"Failed to forward {len(messages)} messages from {chat_id}: {e}")
+                return
+
+
+batcher = ForwardBatcher(client, to_channel)
+
+
 # Register the handler for new messages
 @client.on(events.NewMessage(chats=from_channels))
 async def new_message_handler(event):
-    try:
-        await client.forward_messages(to_channel, event.message)
-        print(f"Forwarded new message from {event.chat_id} to {to_channel}")
-    except Exception as e:
-        print(f"Failed to forward new message: {e}")
+    batcher.add(event.message)
 
 
 # Register the handler for edited messages
 @client.on(events.MessageEdited(chats=from_channels))
 async def edited_message_handler(event):
-    try:
-        await client.forward_messages(to_channel, event.message)
-        print(f"Forwarded edited message from {event.chat_id} to {to_channel}")
-    except Exception as e:
-        print(f"Failed to forward edited message: {e}")
+    batcher.add(event.message)
 
 
 if __name__ == "__main__":
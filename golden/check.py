@@ -0,0 +1,129 @@
+"""Golden-output check for the classifiers.
+
+    python golden/check.py [--version v2] [--channels wolf_forex ...]
+    python golden/check.py --regenerate
+
+Runs every corpus message through ForexSignalProcessor.process_message and
+compares the result dict field by field with golden/expected/<version>/
+<channel>.jsonl (one expected output per corpus line, null where the
+classifier returns None). Values must match exactly, floats included.
+A channel named after a classifier that no chat routes to (lord_forex)
+calls that classifier directly, so it is checked while unrouted. Exits 1
+on any difference. --regenerate rewrites the expected files from
+the current classifiers; review that diff before committing it.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import corpus
+from classifiers import CLASSIFIERS, DEFAULT_ROUTES, ForexSignalProcessor
+
+EXPECTED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "expected")
+MISSING = object()
+
+
+def expected_path(version, channel):
+    return os.path.join(EXPECTED_DIR, version, f"{channel}.jsonl")
+
+
+def classify(processor, channel, messages):
+    if channel in CLASSIFIERS and channel not in DEFAULT_ROUTES.values():
+        process = processor.classifier(channel).process_message
+    else:
+        process = processor.process_message
+    # Round-trip through JSON so results compare like the stored ones
+    return [json.loads(json.dumps(process(message))) for message in messages]
+
+
+def load_expected(version, channel):
+    with open(expected_path(version, channel), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def write_expected(version, channel, outputs):
+    path = expected_path(version, channel)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for output in outputs:
+            f.write(json.dumps(output, ensure_ascii=False, sort_keys=True) + "\n")
+
+
+def diff_values(path, e, a, diffs):
+    """Compare e and a recursively, type() included so 1 and 1.0 or True
+    and 1 stay apart inside take_profit lists and nested dicts too."""
+    if type(e) is not type(a):
+        diffs.append((path, e, a))
+    elif isinstance(e, dict):
+        for key in sorted(e.keys() | a.keys(), key=str):
+            diff_values(f"{path}.{key}", e.get(key, MISSING), a.get(key, MISSING), diffs)
+    elif isinstance(e, list) and len(e) == len(a):
+        for i, (ei, ai) in enumerate(zip(e, a)):
+            diff_values(f"{path}[{i}]", ei, ai, diffs)
+    elif e != a:
+        diffs.append((path, e, a))
+
+
+def diff_fields(expected, actual):
+    """[(field, expected, actual), ...] for every field that differs,
+    nested ones as take_profit[1] or extracted.entry."""
+    if expected is None or actual is None:
+        return [] if expected == actual else [("<result>", expected, actual)]
+    diffs = []
+    for field in sorted(expected.keys() | actual.keys()):
+        diff_values(field, expected.get(field, MISSING), actual.get(field, MISSING), diffs)
+    return diffs
+
+
+def show(value):
+    return "<missing>" if value is MISSING else repr(value)
+
+
+def main():
+    p = argparse.ArgumentParser(description="Classifier golden-output check")
+    p.add_argument("--version", default=corpus.DEFAULT_VERSION)
+    p.add_argument("--channels", nargs="*", default=None)
+    p.add_argument("--regenerate", action="store_true", help="rewrite the expected outputs")
+    args = p.parse_args()
+
+    processor = ForexSignalProcessor()
+    messages = corpus.load(args.version, args.channels)
+
+    if args.regenerate:
+        for channel, msgs in messages.items():
+            write_expected(args.version, channel, classify(processor, channel, msgs))
+            print(f"wrote {expected_path(args.version, channel)} ({len(msgs)} outputs)")
+        return
+
+    failed = 0
+    checked = 0
+    for channel, msgs in messages.items():
+        try:
+            expected = load_expected(args.version, channel)
+        except FileNotFoundError:
+            print(f"{channel}: no expected outputs, run with --regenerate")
+            failed += 1
+            continue
+        if len(expected) != len(msgs):
+            print(f"{channel}: {len(msgs)} corpus messages but {len(expected)} expected outputs")
+            failed += 1
+            continue
+        for message, e, a in zip(msgs, expected, classify(processor, channel, msgs)):
+            checked += 1
+            diffs = diff_fields(e, a)
+            if not diffs:
+                continue
+            failed += 1
+            print(f"{channel} msg_id={message['msg_id']} ({message['msg_type']}):")
+            for field, want, got in diffs:
+                print(f"    {field}: expected {show(want)}, got {show(got)}")
+
+    print(f"{checked} messages checked, {failed} failed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import os
 import json
 import argparse
+import logging
 from dotenv import load_dotenv
 from telethon import TelegramClient, events
-from extension import sqs_client, dynamodb
-from dynamodb_json import json_util
+from extension import get_sqs_client
+from channel_registry import ChannelRegistry, DEFAULT_RELOAD_INTERVAL, bind_handlers
 from datetime import datetime, timezone
+from sqs_producer import SqsBatchProducer
+from spool import Spool
 import uuid
 
 # Load environment variables
@@ -16,34 +19,28 @@ session_name = os.getenv("TG_SESSION_NAME")
 
 # Source channels as a list of integers
 owner_key = "plus"
-from_channels = json_util.loads(dynamodb.query(
-    TableName="signal_channels",
-    IndexName="owner-status-index",
-    KeyConditionExpression="#owner = :owner AND #status = :status",
-    ExpressionAttributeNames={
-        "#owner": "owner",
-        "#status": "status"
-    },
-    ExpressionAttributeValues=json_util.dumps({
-        ":owner": owner_key,
-        ":status": "ACTIVE"
-    }, True)
-).get("Items", []))
-print("from_channels", from_channels)
-from_chat_ids = [channel['chat_id'] for channel in from_channels if channel.get('status') == 'ACTIVE']
-print("from_chat_ids: ", from_chat_ids)
+registry = ChannelRegistry(owner_key).load()
+print("from_channels", list(registry.channels.values()))
+print("from_chat_ids: ", registry.chat_ids)
+
+# Seconds between signal_channels reloads, 0 disables
+CHANNEL_RELOAD_INTERVAL = float(os.getenv("CHANNEL_RELOAD_INTERVAL", DEFAULT_RELOAD_INTERVAL))
+
+SQS_QUEUE_URL = "https://sqs.ap-northeast-2.amazonaws.com/549378813718/tg_msg_queue.fifo"
 
 # Initialize the Telegram client
 client = TelegramClient(session_name, api_id, api_hash)
+# Events are spooled here until SQS accepted them
+SQS_SPOOL_PATH = os.getenv("SQS_SPOOL_PATH", f"sqs_spool_{owner_key}.db")
+producer = SqsBatchProducer(get_sqs_client(), SQS_QUEUE_URL, spool=Spool(SQS_SPOOL_PATH))
 
 
 # Register the handler for new messages
-@client.on(events.NewMessage(chats=from_chat_ids))
 async def new_message_handler(event):
     try:
         print("EVENT: \n", event)
         reply_msg_id = event.reply_to.reply_to_msg_id if event.reply_to else None
-        signal_type = next(filter(lambda c: c['chat_id'] == event.chat_id, from_channels))['signal_type']
+        signal_type = registry.get(event.chat_id)['signal_type']
         
         body={
             "uuid": str(uuid.uuid4()),
@@ -56,13 +53,7 @@ async def new_message_handler(event):
             "signal_type": signal_type,
         }
         print("body to sent to sqs = ", body, "\n")
-        sqs_response = sqs_client.send_message(
-            QueueUrl="https://sqs.ap-northeast-2.amazonaws.com/549378813718/tg_msg_queue.fifo",
-            MessageBody=json.dumps(body),
-            MessageGroupId=f'queue-{event.chat_id}',
-            MessageDeduplicationId=str(uuid.uuid4()),
-        )
-        print("sqs_response = ", sqs_response, "\n\n")
+        await producer.put(body, group_id=f'queue-{event.chat_id}')
         # await client.forward_messages(to_channel, event.message)
         # print(f"Forwarded new message from {event.chat_id} to {to_channel}")
     except Exception as e:
@@ -70,12 +61,11 @@ async def new_message_handler(event):
 
 
 # Register the handler for edited messages
-@client.on(events.MessageEdited(chats=from_chat_ids))
 async def edited_message_handler(event):
     try:
         print("EDIT EVENT: \n", event)
         reply_msg_id = event.reply_to.reply_to_msg_id if event.reply_to else None
-        signal_type = next(filter(lambda c: c['chat_id'] == event.chat_id, from_channels))['signal_type']
+        signal_type = registry.get(event.chat_id)['signal_type']
         body={
             "chat_id": event.chat_id,
             "msg_id": event.message.id,
@@ -86,25 +76,18 @@ async def edited_message_handler(event):
             "signal_type": signal_type,
         }
         print("body to sent to sqs ", body)
-        sqs_response = sqs_client.send_message(
-            QueueUrl="https://sqs.ap-northeast-2.amazonaws.com/549378813718/tg_msg_queue.fifo",
-            MessageBody=json.dumps(body),
-            MessageGroupId=f'queue-{event.chat_id}',
-            MessageDeduplicationId=str(uuid.uuid4()),
-        )
-        print("sqs_response = ", sqs_response, "\n\n")
+        await producer.put(body, group_id=f'queue-{event.chat_id}')
 
         # print(f"Forwarded edited message from {event.chat_id} to {to_channel}")
     except Exception as e:
         print(f"Failed to forward edited message: {e}")
 
 
-@client.on(events.MessageDeleted(chats=from_chat_ids))
 async def deleted_message_handler(event):
     try:
         print("DELETE EVENT: \n", event.stringify())
         # reply_msg_id = event.reply_to.reply_to_msg_id if event.reply_to else None
-        signal_type = next(filter(lambda c: c['chat_id'] == event.chat_id, from_channels))['signal_type']
+        signal_type = registry.get(event.chat_id)['signal_type']
         body={
             "chat_id": event.chat_id,
             "msg_id": event.deleted_id,
@@ -115,18 +98,33 @@ async def deleted_message_handler(event):
             "signal_type": signal_type,
         }
         print("body to sent to sqs ", body)
-        sqs_response = sqs_client.send_message(
-            QueueUrl="https://sqs.ap-northeast-2.amazonaws.com/549378813718/tg_msg_queue.fifo",
-            MessageBody=json.dumps(body),
-            MessageGroupId=f'queue-{event.chat_id}',
-            MessageDeduplicationId=str(uuid.uuid4()),
-        )
-        print("sqs_response = ", sqs_response, "\n\n")
+        await producer.put(body, group_id=f'queue-{event.chat_id}')
     except Exception as e:
         print(f"Failed to forward deleted message: {e}")
 
 
+handlers = [
+    (new_message_handler, events.NewMessage),
+    (edited_message_handler, events.MessageEdited),
+    (deleted_message_handler, events.MessageDeleted),
+]
+bind_handlers(client, registry, handlers)
+
+
 if __name__ == "__main__":
+    # ChannelRegistry reloads and the SQS spool/send metrics log through
+    # the TGForwarder.* loggers
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S",
+    )
     client.start()
+    client.loop.create_task(producer.run())
+    if CHANNEL_RELOAD_INTERVAL > 0:
+        client.loop.create_task(registry.watch(
+            CHANNEL_RELOAD_INTERVAL,
+            on_change=lambda r: bind_handlers(client, r, handlers),
+        ))
     print("Userbot is running...")
     client.run_until_disconnected()
@@ -4,9 +4,11 @@ import argparse
 import logging
 from dotenv import load_dotenv
 from telethon import TelegramClient, events
-from extension import sqs_client, dynamodb
-from dynamodb_json import json_util
+from extension import get_sqs_client
+from channel_registry import ChannelRegistry, DEFAULT_RELOAD_INTERVAL, bind_handlers
 from datetime import datetime, timezone
+from sqs_producer import SqsBatchProducer
+from spool import Spool
 import uuid
 
 # ----------------------
@@ -31,38 +33,27 @@ api_id = int(os.getenv("TG_API_ID"))
 api_hash = os.getenv("TG_API_HASH")
 session_name = os.getenv("TG_SESSION_NAME")
 
+SQS_QUEUE_URL = "https://sqs.ap-northeast-2.amazonaws.com/549378813718/tg_msg_queue.fifo"
+
 # Initialize Telegram client
 client = TelegramClient(session_name, api_id, api_hash)
+# Created in __main__ once the owner (and so the spool file) is known
+producer: SqsBatchProducer = None
 
 
-def load_channels(owner_key: str):
+def load_channels(owner_key: str) -> ChannelRegistry:
     """Query DynamoDB for active channels belonging to the given owner."""
     logger.info("Loading channels for owner='%s'", owner_key)
-    from_channels = json_util.loads(
-        dynamodb.query(
-            TableName="signal_channels",
-            IndexName="owner-status-index",
-            KeyConditionExpression="#owner = :owner AND #status = :status",
-            ExpressionAttributeNames={
-                "#owner": "owner",
-                "#status": "status"
-            },
-            ExpressionAttributeValues=json_util.dumps({
-                ":owner": owner_key,
-                ":status": "ACTIVE"
-            }, True)
-        ).get("Items", [])
-    )
-    from_chat_ids = [ch['chat_id'] for ch in from_channels if ch.get('status') == 'ACTIVE']
-    logger.info("Loaded %d active channels", len(from_chat_ids))
-    return from_channels, from_chat_ids
-
-
-async def handle_message(event, msg_type: str, from_channels):
-    """Helper to send message events (NEW, EDITED, DELETED) to SQS."""
+    registry = ChannelRegistry(owner_key).load()
+    logger.info("Loaded %d active channels", len(registry))
+    return registry
+
+
+async def handle_message(event, msg_type: str, registry: ChannelRegistry):
+    """Helper to queue message events (NEW, EDITED, DELETED) for SQS."""
     try:
         reply_msg_id = event.reply_to.reply_to_msg_id if event.reply_to else None
-        signal_type = next(filter(lambda c: c['chat_id'] == event.chat_id, from_channels))['signal_type']
+        signal_type = registry.get(event.chat_id)['signal_type']
 
         body = {
             "uuid": str(uuid.uuid4()),
@@ -82,13 +73,7 @@ async def handle_message(event, msg_type: str, from_channels):
         logger.info("[%s] chat_id=%s msg_id=%s", msg_type, event.chat_id, body["msg_id"])
         logger.debug("Payload: %s", json.dumps(body, ensure_ascii=False, indent=2))
 
-        sqs_response = sqs_client.send_message(
-            QueueUrl="https://sqs.ap-northeast-2.amazonaws.com/549378813718/tg_msg_queue.fifo",
-            MessageBody=json.dumps(body),
-            MessageGroupId=f'queue-{event.chat_id}',
-            MessageDeduplicationId=str(uuid.uuid4()),
-        )
-        logger.info("[%s] Sent to SQS (MessageId=%s)", msg_type, sqs_response.get("MessageId"))
+        await producer.put(body, group_id=f'queue-{event.chat_id}')
 
     except Exception as e:
         logger.exception("Failed to forward %s message: %s", msg_type, str(e))
@@ -97,6 +82,10 @@ async def handle_message(event, msg_type: str, from_channels):
 def parse_args():
     p = argparse.ArgumentParser(description="Telegram SQS forwarder")
     p.add_argument("--owner", dest="owner", type=str, required=True, help="owner key")
+    p.add_argument("--reload-interval", dest="reload_interval", type=float, default=DEFAULT_RELOAD_INTERVAL,
+                   help="seconds between signal_channels reloads, 0 disables")
+    p.add_argument("--spool", dest="spool", type=str, default=None,
+                   help="SQLite spool for unsent events (default sqs_spool_<owner>.db)")
     return p.parse_args()
 
 
@@ -104,23 +93,35 @@ if __name__ == "__main__":
     args = parse_args()
     owner_key = args.owner
 
-    from_channels, from_chat_ids = load_channels(owner_key)
-    logger.info("From channels: %s", from_channels)
-    logger.info("From chat_ids: %s", from_chat_ids)
+    producer = SqsBatchProducer(get_sqs_client(), SQS_QUEUE_URL, spool=Spool(args.spool or f"sqs_spool_{owner_key}.db"))
+    registry = load_channels(owner_key)
+    logger.info("From channels: %s", list(registry.channels.values()))
+    logger.info("From chat_ids: %s", registry.chat_ids)
 
-    # Register handlers after channels are known
-    @client.on(events.NewMessage(chats=from_chat_ids))
     async def new_message_handler(event):
-        await handle_message(event, "NEW", from_channels)
+        await handle_message(event, "NEW", registry)
 
-    @client.on(events.MessageEdited(chats=from_chat_ids))
     async def edited_message_handler(event):
-        await handle_message(event, "EDITED", from_channels)
+        await handle_message(event, "EDITED", registry)
 
-    @client.on(events.MessageDeleted(chats=from_chat_ids))
     async def deleted_message_handler(event):
-        await handle_message(event, "DELETED", from_channels)
+        await handle_message(event, "DELETED", registry)
+
+    # Register handlers after channels are known, and again whenever the
+    # channel set changes
+    handlers = [
+        (new_message_handler, events.NewMessage),
+        (edited_message_handler, events.MessageEdited),
+        (deleted_message_handler, events.MessageDeleted),
+    ]
+    bind_handlers(client, registry, handlers)
 
     client.start()
+    client.loop.create_task(producer.run())
+    if args.reload_interval > 0:
+        client.loop.create_task(registry.watch(
+            args.reload_interval,
+            on_change=lambda r: bind_handlers(client, r, handlers),
+        ))
     logger.info("Userbot is running...")
     client.run_until_disconnected()
@@ -0,0 +1,79 @@
+import sqlite3
+import time
+from typing import List, Tuple
+
+SPOOL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    group_id TEXT NOT NULL,
+    dedup_id TEXT NOT NULL,
+    body TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+SPOOL_GROUP_INDEX = "CREATE INDEX IF NOT EXISTS events_group_id ON events (group_id, id)"
+
+
+class Spool:
+    """Append-only SQLite (WAL) spool of outbound SQS entries.
+
+    Entries are appended before anything is sent and deleted only once SQS
+    acknowledged them, so events survive SQS outages and process restarts.
+    Rows come back in append order, which keeps FIFO order per group.
+    Use ":memory:" for a throwaway spool.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL survives process crashes, only an OS crash can lose
+        # the last commits
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SPOOL_SCHEMA)
+        self.conn.execute(SPOOL_GROUP_INDEX)
+
+    def append(self, body: str, group_id: str, dedup_id: str) -> int:
+        cur = self.conn.execute(
+            "INSERT INTO events (group_id, dedup_id, body, created_at) VALUES (?, ?, ?, ?)",
+            (group_id, dedup_id, body, time.time()),
+        )
+        return cur.lastrowid
+
+    def peek(self, limit: int) -> List[Tuple[int, dict]]:
+        """Oldest `limit` unacked entries as (id, SendMessageBatch entry)."""
+        rows = self.conn.execute(
+            "SELECT id, group_id, dedup_id, body FROM events ORDER BY id LIMIT ?", (limit,)
+        ).fetchall()
+        return self._entries(rows)
+
+    def peek_heads(self, limit: int) -> List[Tuple[int, dict]]:
+        """Oldest unacked entry of each group, for the `limit` groups waiting longest."""
+        rows = self.conn.execute(
+            "SELECT id, group_id, dedup_id, body FROM events "
+            "WHERE id IN (SELECT MIN(id) FROM events GROUP BY group_id) ORDER BY id LIMIT ?", (limit,)
+        ).fetchall()
+        return self._entries(rows)
+
+    @staticmethod
+    def _entries(rows) -> List[Tuple[int, dict]]:
+        return [(row_id, {
+            "MessageBody": body,
+            "MessageGroupId": group_id,
+            "MessageDeduplicationId": dedup_id,
+        }) for row_id, group_id, dedup_id, body in rows]
+
+    def ack(self, ids: List[int]):
+        if ids:
+            self.conn.execute(f"DELETE FROM events WHERE id IN ({','.join('?' * len(ids))})", list(ids))
+
+    def depth(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def lag(self) -> float:
+        """Age in seconds of the oldest unacked entry, 0 when empty."""
+        oldest = self.conn.execute("SELECT MIN(created_at) FROM events").fetchone()[0]
+        return time.time() - oldest if oldest is not None else 0.0
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from functools import partial
+from spool import Spool
+
+logger = logging.getLogger("TGForwarder.sqs")
+
+SQS_MAX_BATCH = 10
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30
+METRICS_INTERVAL = 60
+
+
+class SqsBatchProducer:
+    """Spools listener events and drains them with SendMessageBatch.
+
+    `put` appends the event to the spool and returns; the drainer (`run`)
+    ships batches of up to `max_batch` entries, waiting up to `linger`
+    seconds for a batch to fill. Entries are removed from the spool only
+    after SQS accepted them, failed sends are retried with exponential
+    backoff and entries left over from a previous run are replayed first.
+    The MessageDeduplicationId is stored with the entry so a replay within
+    SQS's 5 minute dedup window is not delivered twice.
+
+    A batch holds only the oldest entry of each MessageGroupId. SQS judges
+    the entries of a batch one by one, so a later entry of the same group
+    could be accepted while an earlier one failed and overtake it on the
+    retry. Different groups (channels) still share a batch, and a single
+    drainer sends batches one after another, which keeps FIFO order per
+    group.
+    """
+
+    def __init__(self, sqs_client, queue_url: str, max_batch: int = SQS_MAX_BATCH, linger: float = 0.005,
+                 spool: Spool = None):
+        self.sqs_client = sqs_client
+        self.queue_url = queue_url
+        self.max_batch = min(max_batch, SQS_MAX_BATCH)
+        self.linger = linger
+        self.spool = spool or Spool()
+        self.pending = asyncio.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    async def put(self, body: dict, group_id: str):
+        self.spool.append(json.dumps(body), group_id, str(uuid.uuid4()))
+        self.pending.set()
+
+    def metrics(self) -> dict:
+        return {
+            "depth": self.spool.depth(),
+            "lag_seconds": round(self.spool.lag(), 3),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def _next_batch(self):
+        while True:
+            self.pending.clear()
+            rows = self.spool.peek_heads(self.max_batch)
+            if not rows:
+                await self.pending.wait()
+                continue
+            if len(rows) < self.max_batch and self.linger > 0:
+                await asyncio.sleep(self.linger)
+                rows = self.spool.peek_heads(self.max_batch)
+            return rows
+
+    async def flush(self, rows) -> bool:
+        """Send one batch, ack what SQS accepted. False if anything is left to retry."""
+        batch = [{**entry, "Id": str(row_id)} for row_id, entry in rows]
+        loop = asyncio.get_running_loop()
+        try:
+            resp = await loop.run_in_executor(None, partial(
+                self.sqs_client.send_message_batch,
+                QueueUrl=self.queue_url,
+                Entries=batch,
+            ))
+        except Exception as e:
+            self.failed += len(batch)
+            logger.warning("SendMessageBatch of %d events failed, will retry: %s", len(batch), str(e))
+            return False
+        done = []
+        for ok in resp.get("Successful", []):
+            logger.info("Sent to SQS (MessageId=%s)", ok.get("MessageId"))
+            done.append(int(ok["Id"]))
+        self.sent += len(done)
+        retry = False
+        for failed in resp.get("Failed", []):
+            entry = next(e for e in batch if e["Id"] == failed["Id"])
+            if failed.get("SenderFault"):
+                # Malformed entry, resending won't help
+                self.dropped += 1
+                done.append(int(failed["Id"]))
+                logger.error("SQS rejected %s: %s %s", entry["MessageBody"], failed.get("Code"), failed.get("Message"))
+            else:
+                self.failed += 1
+                retry = True
+                logger.warning("SQS failed %s: %s, will retry", entry["MessageBody"], failed.get("Code"))
+        self.spool.ack(done)
+        return not retry
+
+    async def run(self):
+        depth = self.spool.depth()
+        if depth:
+            logger.info("Replaying %d spooled events (oldest %.1fs old)", depth, self.spool.lag())
+        backoff = BACKOFF_BASE
+        metrics_at = time.monotonic() + METRICS_INTERVAL
+        while True:
+            rows = await self._next_batch()
+            logger.debug("Flushing %d events", len(rows))
+            if await self.flush(rows):
+                backoff = BACKOFF_BASE
+            else:
+                logger.info("Backing off %.1fs, spool depth %d", backoff, self.spool.depth())
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, BACKOFF_MAX)
+            if time.monotonic() >= metrics_at:
+                logger.info("SQS spool metrics: %s", self.metrics())
+                metrics_at = time.monotonic() + METRICS_INTERVAL
+
+
+if __name__ == "__main__":
+    # Drain a spool of three channels into a local SQS stand-in that is
+    # down for the first two calls and then fails the first entry of the
+    # next batch; each channel must still arrive in order.
+    #   python sqs_producer.py [spool.db]
+    import sys
+
+    class LocalSqs:
+        def __init__(self, down_for: int = 2):
+            self.down_for = down_for
+            self.reject_next = True
+            self.received = []
+
+        def send_message_batch(self, QueueUrl, Entries):
+            if self.down_for > 0:
+                self.down_for -= 1
+                raise ConnectionError("SQS unreachable")
+            failed = []
+            if self.reject_next:
+                self.reject_next = False
+                Entries, failed = Entries[1:], Entries[:1]
+            self.received += [e["MessageBody"] for e in Entries]
+            return {
+                "Successful": [{"Id": e["Id"], "MessageId": str(uuid.uuid4())} for e in Entries],
+                "Failed": [{"Id": e["Id"], "Code": "InternalError", "SenderFault": False} for e in failed],
+            }
+
+    async def demo():
+        sqs = LocalSqs()
+        producer = SqsBatchProducer(sqs, "local", spool=Spool(sys.argv[1] if len(sys.argv) > 1 else ":memory:"))
+        task = asyncio.create_task(producer.run())
+        for i in range(24):
+            await producer.put({"chat_id": i % 3, "msg_id": i}, group_id=f"queue-{i % 3}")
+        while producer.spool.depth():
+            await asyncio.sleep(0.1)
+        task.cancel()
+        received = [json.loads(b) for b in sqs.received]
+        for chat_id in range(3):
+            msg_ids = [m["msg_id"] for m in received if m["chat_id"] == chat_id]
+            print(f"queue-{chat_id} received:", msg_ids, "in order" if msg_ids == sorted(msg_ids) else "OUT OF ORDER")
+        print(producer.metrics())
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(demo())
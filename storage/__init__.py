@@ -0,0 +1,44 @@
+"""Repository layer over the create_tables.py tables.
+
+    from storage import get_storage
+    store = get_storage()
+    store.orders.create(order)
+
+STORAGE_BACKEND picks the implementation: "dynamodb" (default, the
+extension.dynamodb client) or "sqlite", which keeps every table in the
+SQLite file STORAGE_SQLITE_PATH (":memory:" for a throwaway one) so the
+pipeline can run and be load-tested without AWS.
+"""
+from os import getenv
+from storage.base import (
+    ChannelStore, ConnectionStore, CredentialStore, DeadLetterStore, MessageStore, OrderStore, Storage,
+)
+
+STORAGE_BACKEND = getenv("STORAGE_BACKEND", "dynamodb")
+STORAGE_SQLITE_PATH = getenv("STORAGE_SQLITE_PATH", "local_storage.db")
+
+_storage = None
+
+
+def make_storage(backend: str = STORAGE_BACKEND, sqlite_path: str = STORAGE_SQLITE_PATH) -> Storage:
+    if backend == "dynamodb":
+        from storage.dynamodb import dynamodb_storage
+        return dynamodb_storage()
+    if backend == "sqlite":
+        from storage.sqlite import sqlite_storage
+        return sqlite_storage(sqlite_path)
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}, expected 'dynamodb' or 'sqlite'")
+
+
+def get_storage() -> Storage:
+    """Process-wide storage of the configured backend, reused across warm invocations."""
+    global _storage
+    if _storage is None:
+        _storage = make_storage()
+    return _storage
+
+
+def set_storage(storage: Storage):
+    """Swap the process-wide storage, e.g. for a benchmark or replay."""
+    global _storage
+    _storage = storage
@@ -0,0 +1,132 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class MessageStore:
+    """telegram_msgs: raw-message audit rows keyed by (chat_id, msg_id)."""
+
+    def put_many(self, rows: Iterable[dict]) -> Set[Tuple[int, int]]:
+        """Write the rows, returns the (chat_id, msg_id) keys that could not be written."""
+        raise NotImplementedError
+
+    def get(self, chat_id: int, msg_id: int) -> Optional[dict]:
+        raise NotImplementedError
+
+    def update_text(self, chat_id: int, msg_id: int, text: str, action: str, updated_at: str):
+        """Set text/action/updated_at, creating the row when missing."""
+        raise NotImplementedError
+
+
+class OrderStore:
+    """orders keyed by order_id (chat_id_msg_id)."""
+
+    def create(self, order: dict, audit_row: Optional[dict] = None) -> Optional[dict]:
+        """Create the order unless it exists, atomically with its telegram_msgs row if given.
+
+        Returns None when created, otherwise the order already stored (SQS
+        redelivery) so the caller can tell from its delivery state whether
+        it is a real duplicate.
+        """
+        raise NotImplementedError
+
+    def get(self, order_id: str) -> Optional[dict]:
+        """Strongly consistent read of one order."""
+        raise NotImplementedError
+
+    def update_status(self, order_id: str, status: str, updated_at: str) -> dict:
+        """Set status/updated_at (upsert like update_item), returns the new order."""
+        raise NotImplementedError
+
+    def record_delivery(self, order_id: str, delivered: List[str], to_chat_id: Optional[int] = None,
+                        to_msg_id: Optional[int] = None):
+        """Set the delivery steps done so far and, once posted, where the signal went."""
+        raise NotImplementedError
+
+
+class ConnectionStore:
+    """websocket_connections keyed by connection_id.
+
+    The table also holds one metadata item, VERSION_KEY, whose counter is
+    bumped whenever connections come or go so warm containers know when
+    their cached subscriber lists are stale. It has no status or
+    channel_id, so neither index sees it.
+    """
+
+    VERSION_KEY = "#version"
+
+    def put(self, connection: dict):
+        raise NotImplementedError
+
+    def delete(self, connection_id: str):
+        raise NotImplementedError
+
+    def delete_many(self, connection_ids: Iterable[str]):
+        """Delete many connections in as few round trips as possible."""
+        raise NotImplementedError
+
+    def active(self) -> List[dict]:
+        """Every connection with status 1."""
+        raise NotImplementedError
+
+    def for_channel(self, channel_id: str) -> List[dict]:
+        """Connections with status 1 subscribed to one channel, at least their connection_id."""
+        raise NotImplementedError
+
+    def version(self) -> int:
+        """Current value of the connections version counter, 0 before the first bump."""
+        raise NotImplementedError
+
+    def bump_version(self):
+        raise NotImplementedError
+
+
+class ChannelStore:
+    """signal_channels keyed by chat_id."""
+
+    def active_for_owner(self, owner: str) -> List[dict]:
+        """ACTIVE channels of one owner (owner-status-index)."""
+        raise NotImplementedError
+
+    def active(self) -> List[dict]:
+        """ACTIVE channels of every owner."""
+        raise NotImplementedError
+
+    def classifier_routes(self) -> Dict[int, str]:
+        """chat_id -> classifier name for every channel that has one."""
+        raise NotImplementedError
+
+
+class CredentialStore:
+    """binance_api_key_secrets and forex_account_credentials, keyed by owner."""
+
+    def binance_accounts(self, status: str = "ENABLED") -> List[dict]:
+        raise NotImplementedError
+
+    def forex_accounts(self, status: str = "ENABLED") -> List[dict]:
+        raise NotImplementedError
+
+
+class DeadLetterStore:
+    """dead_letters: TgMsgFifoQueue records that ran out of receives, keyed by message_id."""
+
+    def put_many(self, rows: Iterable[dict]) -> Set[str]:
+        """Write the rows, returns the message_ids that could not be written."""
+        raise NotImplementedError
+
+
+class Storage:
+    """The stores of one backend.
+
+    `db` is the SQLite backend's SqliteDatabase, for tools that inspect the
+    tables directly; None on DynamoDB.
+    """
+
+    def __init__(self, messages: MessageStore, orders: OrderStore, connections: ConnectionStore,
+                 channels: ChannelStore, credentials: CredentialStore, dead_letters: DeadLetterStore,
+                 db: Optional[object] = None):
+        self.messages = messages
+        self.orders = orders
+        self.connections = connections
+        self.channels = channels
+        self.credentials = credentials
+        self.dead_letters = dead_letters
+        self.db = db
@@ -0,0 +1,377 @@
+import re
+import time
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List
+from boto3.dynamodb.types import DYNAMODB_CONTEXT
+from dynamodb_json import json_util
+from storage.base import (
+    ChannelStore, ConnectionStore, CredentialStore, DeadLetterStore, MessageStore, OrderStore, Storage,
+)
+
+BATCH_WRITE_MAX_ITEMS = 25
+BATCH_WRITE_MAX_ATTEMPTS = 5
+
+
+# dumps/loads give the same results as json_util.dumps(x, True) and
+# json_util.loads(x, True) without their JSON round trip and per-string
+# strptime attempt (see benchmarks/storage_bench.py). Unlike json_util,
+# loads goes by the attribute types, so a map key that happens to be
+# named "S" or "N" stays a key.
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+FLOAT_N = re.compile(r"^-?\d+?\.\d+?$")
+
+
+def number(value) -> str:
+    # repr() is what json.dumps writes, then the same normalisation as
+    # TypeSerializer
+    return str(DYNAMODB_CONTEXT.create_decimal(value if isinstance(value, Decimal) else Decimal(repr(value))))
+
+
+def attribute(value) -> dict:
+    if value is None:
+        return {"NULL": True}
+    if isinstance(value, bool):
+        return {"BOOL": value}
+    if isinstance(value, str):
+        return {"S": value}
+    if isinstance(value, (int, float, Decimal)):
+        return {"N": number(value)}
+    if isinstance(value, dict):
+        return {"M": {str(k): attribute(v) for k, v in value.items()}}
+    if isinstance(value, (list, tuple, set)):
+        return {"L": [attribute(v) for v in value]}
+    if isinstance(value, datetime):
+        return {"S": value.strftime(DATETIME_FORMAT)}
+    if isinstance(value, date):
+        return {"S": value.strftime("%Y-%m-%d")}
+    if isinstance(value, uuid.UUID):
+        return {"S": value.hex}
+    return json_util.dumps(value, True)
+
+
+def python_value(attr: dict):
+    if "BOOL" in attr:
+        return attr["BOOL"]
+    if "S" in attr:
+        value = attr["S"]
+        # strptime can only match strings with the format's literal T and .
+        if "T" in value and "." in value:
+            try:
+                return datetime.strptime(value, DATETIME_FORMAT)
+            except ValueError:
+                pass
+        return value
+    if "SS" in attr:
+        return list(attr["SS"])
+    if "N" in attr:
+        if FLOAT_N.match(attr["N"]):
+            return float(attr["N"])
+        try:
+            return int(attr["N"])
+        except ValueError:
+            # json_util hands back exponent forms like "1E-7" untouched
+            return attr
+    if "B" in attr:
+        return str(attr["B"])
+    if "NS" in attr:
+        return set(attr["NS"])
+    if "BS" in attr:
+        return set(attr["BS"])
+    if "M" in attr:
+        return {k: python_value(v) for k, v in attr["M"].items()}
+    if "L" in attr:
+        return [python_value(v) for v in attr["L"]]
+    if attr.get("NULL") is True:
+        return None
+    return json_util.loads(attr, True)
+
+
+def dumps(item: dict) -> dict:
+    """Plain dict -> DynamoDB attribute map."""
+    return {str(k): attribute(v) for k, v in item.items()}
+
+
+def loads(value):
+    """Attribute map (or list of them, or None) -> plain dicts."""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [loads(item) for item in value]
+    return {k: python_value(v) for k, v in value.items()}
+
+
+def query_all(client, **kwargs) -> List[dict]:
+    """Every item of a query or scan, following LastEvaluatedKey."""
+    op = client.scan if "KeyConditionExpression" not in kwargs else client.query
+    items = []
+    while True:
+        resp = op(**kwargs)
+        items += loads(resp.get("Items", []))
+        if "LastEvaluatedKey" not in resp:
+            return items
+        kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+
+def batch_write(client, table, requests) -> List[dict]:
+    """BatchWriteItem in chunks of 25, unprocessed items retried with
+    exponential backoff. Returns the requests that still failed."""
+    unprocessed = []
+    for i in range(0, len(requests), BATCH_WRITE_MAX_ITEMS):
+        pending = {table: requests[i:i + BATCH_WRITE_MAX_ITEMS]}
+        for attempt in range(BATCH_WRITE_MAX_ATTEMPTS):
+            pending = client.batch_write_item(RequestItems=pending).get("UnprocessedItems") or {}
+            if not pending:
+                break
+            time.sleep(0.05 * 2 ** attempt)
+        unprocessed += pending.get(table, [])
+    return unprocessed
+
+
+class DynamoMessageStore(MessageStore):
+    def __init__(self, client):
+        self.client = client
+
+    def put_many(self, rows):
+        unprocessed = batch_write(self.client, "telegram_msgs", [
+            {"PutRequest": {"Item": dumps(row)}} for row in rows
+        ])
+        keys = set()
+        for request in unprocessed:
+            row = loads(request["PutRequest"]["Item"])
+            keys.add((row["chat_id"], row["msg_id"]))
+        return keys
+
+    def get(self, chat_id, msg_id):
+        return loads(self.client.get_item(
+            TableName="telegram_msgs",
+            Key=dumps({"chat_id": chat_id, "msg_id": msg_id}),
+        ).get("Item", None))
+
+    def update_text(self, chat_id, msg_id, text, action, updated_at):
+        self.client.update_item(
+            TableName="telegram_msgs",
+            Key=dumps({"chat_id": chat_id, "msg_id": msg_id}),
+            UpdateExpression="SET #text = :text, #action = :action, #updated_at = :updated_at",
+            ExpressionAttributeNames={
+                "#text": "text",
+                "#action": "action",
+                "#updated_at": "updated_at",
+            },
+            ExpressionAttributeValues=dumps({
+                ":text": text,
+                ":action": action,
+                ":updated_at": updated_at,
+            }),
+        )
+
+
+class DynamoOrderStore(OrderStore):
+    def __init__(self, client):
+        self.client = client
+
+    def create(self, order, audit_row=None):
+        put = {
+            "TableName": "orders",
+            "Item": dumps(order),
+            "ConditionExpression": "attribute_not_exists(order_id)",
+            # The stored order comes back with the failure, no extra read
+            "ReturnValuesOnConditionCheckFailure": "ALL_OLD",
+        }
+        if audit_row is None:
+            try:
+                self.client.put_item(**put)
+            except self.client.exceptions.ConditionalCheckFailedException as e:
+                return self._existing(order["order_id"], e.response.get("Item"))
+            return None
+
+        try:
+            self.client.transact_write_items(TransactItems=[
+                {"Put": {"TableName": "telegram_msgs", "Item": dumps(audit_row)}},
+                {"Put": put},
+            ])
+        except self.client.exceptions.TransactionCanceledException as e:
+            reasons = e.response.get("CancellationReasons", [])
+            if len(reasons) > 1 and reasons[1].get("Code") == "ConditionalCheckFailed":
+                return self._existing(order["order_id"], reasons[1].get("Item"))
+            raise
+        return None
+
+    def _existing(self, order_id, item):
+        # Endpoints without ReturnValuesOnConditionCheckFailure support
+        return loads(item) if item else self.get(order_id)
+
+    def get(self, order_id):
+        resp = self.client.get_item(TableName="orders", Key={"order_id": {"S": order_id}}, ConsistentRead=True)
+        return loads(resp["Item"]) if "Item" in resp else None
+
+    def update_status(self, order_id, status, updated_at):
+        resp = self.client.update_item(
+            TableName="orders",
+            Key={"order_id": {"S": order_id}},
+            UpdateExpression="SET #status = :status, #updated_at = :updated_at",
+            ExpressionAttributeNames={
+                "#status": "status",
+                "#updated_at": "updated_at",
+            },
+            ExpressionAttributeValues=dumps({
+                ":status": status,
+                ":updated_at": updated_at,
+            }),
+            ReturnValues="ALL_NEW",
+        )
+        return loads(resp["Attributes"])
+
+    def record_delivery(self, order_id, delivered, to_chat_id=None, to_msg_id=None):
+        values = {":delivered": delivered}
+        if to_msg_id is not None:
+            values.update({":to_chat_id": to_chat_id, ":to_msg_id": to_msg_id})
+        self.client.update_item(
+            TableName="orders",
+            Key={"order_id": {"S": order_id}},
+            UpdateExpression="SET " + ", ".join(f"{name[1:]} = {name}" for name in values),
+            ExpressionAttributeValues=dumps(values),
+        )
+
+
+class DynamoConnectionStore(ConnectionStore):
+    def __init__(self, client):
+        self.client = client
+
+    def put(self, connection):
+        self.client.put_item(TableName="websocket_connections", Item=dumps(connection))
+
+    def delete(self, connection_id):
+        self.client.delete_item(
+            TableName="websocket_connections",
+            Key=dumps({"connection_id": connection_id}),
+        )
+
+    def delete_many(self, connection_ids):
+        unprocessed = batch_write(self.client, "websocket_connections", [
+            {"DeleteRequest": {"Key": {"connection_id": {"S": connection_id}}}}
+            for connection_id in connection_ids
+        ])
+        if unprocessed:
+            print(f"websocket_connections deletes unprocessed after retries : {len(unprocessed)}")
+
+    def active(self):
+        return query_all(
+            self.client,
+            TableName="websocket_connections",
+            IndexName="status-connected_at-index",
+            KeyConditionExpression="#status = :status",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues=dumps({":status": 1}),
+            ProjectionExpression="connection_id, channel_id",
+        )
+
+    def version(self):
+        item = self.client.get_item(
+            TableName="websocket_connections",
+            Key={"connection_id": {"S": self.VERSION_KEY}},
+            ProjectionExpression="version",
+            # A connect that just happened must not be missed
+            ConsistentRead=True,
+        ).get("Item")
+        return int(item["version"]["N"]) if item else 0
+
+    def bump_version(self):
+        self.client.update_item(
+            TableName="websocket_connections",
+            Key={"connection_id": {"S": self.VERSION_KEY}},
+            UpdateExpression="ADD version :one",
+            ExpressionAttributeValues={":one": {"N": "1"}},
+        )
+
+    def for_channel(self, channel_id):
+        # Reads only this channel's subscribers, page by page
+        return query_all(
+            self.client,
+            TableName="websocket_connections",
+            IndexName="channel_id-status-index",
+            KeyConditionExpression="channel_id = :channel_id AND #status = :status",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues=dumps({":channel_id": channel_id, ":status": 1}),
+        )
+
+
+class DynamoChannelStore(ChannelStore):
+    def __init__(self, client):
+        self.client = client
+
+    def active_for_owner(self, owner):
+        return query_all(
+            self.client,
+            TableName="signal_channels",
+            IndexName="owner-status-index",
+            KeyConditionExpression="#owner = :owner AND #status = :status",
+            ExpressionAttributeNames={
+                "#owner": "owner",
+                "#status": "status"
+            },
+            ExpressionAttributeValues=dumps({
+                ":owner": owner,
+                ":status": "ACTIVE"
+            }),
+        )
+
+    def active(self):
+        return query_all(
+            self.client,
+            TableName="signal_channels",
+            FilterExpression="#status = :status",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues=dumps({":status": "ACTIVE"}),
+        )
+
+    def classifier_routes(self) -> Dict[int, str]:
+        channels = query_all(self.client, TableName="signal_channels", ProjectionExpression="chat_id, classifier")
+        return {int(ch["chat_id"]): ch["classifier"] for ch in channels if ch.get("classifier")}
+
+
+class DynamoCredentialStore(CredentialStore):
+    def __init__(self, client):
+        self.client = client
+
+    def _by_status(self, table, status):
+        return query_all(
+            self.client,
+            TableName=table,
+            IndexName="status-index",
+            KeyConditionExpression="#status = :status",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues=dumps({":status": status}),
+        )
+
+    def binance_accounts(self, status="ENABLED"):
+        return self._by_status("binance_api_key_secrets", status)
+
+    def forex_accounts(self, status="ENABLED"):
+        return self._by_status("forex_account_credentials", status)
+
+
+class DynamoDeadLetterStore(DeadLetterStore):
+    def __init__(self, client):
+        self.client = client
+
+    def put_many(self, rows):
+        unprocessed = batch_write(self.client, "dead_letters", [
+            {"PutRequest": {"Item": dumps(row)}} for row in rows
+        ])
+        return {request["PutRequest"]["Item"]["message_id"]["S"] for request in unprocessed}
+
+
+def dynamodb_storage(client=None) -> Storage:
+    if client is None:
+        from extension import get_dynamodb
+        client = get_dynamodb()
+    return Storage(
+        messages=DynamoMessageStore(client),
+        orders=DynamoOrderStore(client),
+        connections=DynamoConnectionStore(client),
+        channels=DynamoChannelStore(client),
+        credentials=DynamoCredentialStore(client),
+        dead_letters=DynamoDeadLetterStore(client),
+    )
@@ -0,0 +1,269 @@
+import contextlib
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+from storage.base import (
+    ChannelStore, ConnectionStore, CredentialStore, DeadLetterStore, MessageStore, OrderStore, Storage,
+)
+
+# Same tables, keys and GSI attributes as create_tables.py: (key, indexes)
+TABLES = {
+    "signal_channels": (("chat_id",), (("signal_type", "name"), ("owner", "status"))),
+    "telegram_msgs": (("chat_id", "msg_id"), ()),
+    "orders": (("order_id",), (("chat_id", "status"),)),
+    "websocket_connections": (("connection_id",), (("status", "connected_at"), ("channel_id", "status"))),
+    "binance_api_key_secrets": (("owner",), (("status",),)),
+    "forex_account_credentials": (("owner",), (("status",), ("owner", "status"))),
+    "dead_letters": (("message_id",), ()),
+}
+
+
+def quoted(attrs: Iterable[str]) -> str:
+    # "status", "name" etc. are SQL keywords
+    return ", ".join(f'"{a}"' for a in attrs)
+
+
+class SqliteTable:
+    """One DynamoDB-shaped table: key and index attributes as columns, the
+    whole item as JSON next to them."""
+
+    def __init__(self, db: "SqliteDatabase", name: str, key: tuple, indexes: tuple):
+        self.db = db
+        self.name = name
+        self.key = key
+        self.columns = list(dict.fromkeys(key + tuple(a for index in indexes for a in index)))
+        db.conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} ("
+            f"{quoted(self.columns)}, item TEXT NOT NULL, PRIMARY KEY ({quoted(key)}))"
+        )
+        # Index attributes added since the file was created
+        existing = {row[1] for row in db.conn.execute(f"PRAGMA table_info({name})")}
+        for column in self.columns:
+            if column not in existing:
+                db.conn.execute(f'ALTER TABLE {name} ADD COLUMN "{column}"')
+                db.conn.execute(f'UPDATE {name} SET "{column}" = json_extract(item, ?)', (f"$.{column}",))
+        for index in indexes:
+            db.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {name}_{'_'.join(index)} ON {name} ({quoted(index)})"
+            )
+
+    def _where(self, attrs: Iterable[str]) -> str:
+        return " AND ".join(f'"{a}" = ?' for a in attrs)
+
+    def get(self, **key) -> Optional[dict]:
+        row = self.db.conn.execute(
+            f"SELECT item FROM {self.name} WHERE {self._where(self.key)}", [key[k] for k in self.key]
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, item: dict, if_absent: bool = False) -> bool:
+        """Insert or replace; with if_absent, False when the key already exists."""
+        verb = "INSERT OR IGNORE" if if_absent else "INSERT OR REPLACE"
+        cur = self.db.conn.execute(
+            f"{verb} INTO {self.name} ({quoted(self.columns)}, item) "
+            f"VALUES ({', '.join('?' * (len(self.columns) + 1))})",
+            [item.get(c) for c in self.columns] + [json.dumps(item)],
+        )
+        return cur.rowcount == 1
+
+    def update(self, key: dict, changes: dict) -> dict:
+        """update_item SET semantics: merge into the item, creating it if missing."""
+        with self.db.transaction():
+            item = {**(self.get(**key) or key), **changes}
+            self.put(item)
+        return item
+
+    def delete(self, **key):
+        self.db.conn.execute(f"DELETE FROM {self.name} WHERE {self._where(self.key)}", [key[k] for k in self.key])
+
+    def query(self, **equals) -> List[dict]:
+        """Items whose attributes equal `equals`, all items when empty."""
+        where = f" WHERE {self._where(equals)}" if equals else ""
+        rows = self.db.conn.execute(f"SELECT item FROM {self.name}{where}", list(equals.values())).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+class SqliteDatabase:
+    """Every create_tables.py table in one SQLite file, for running the
+    pipeline locally without AWS. Use ":memory:" for a throwaway database."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # The handler writes from a thread pool; one writer at a time
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.tables: Dict[str, SqliteTable] = {
+            name: SqliteTable(self, name, key, indexes) for name, (key, indexes) in TABLES.items()
+        }
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with self.lock:
+            outermost = self.depth == 0
+            if outermost:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self.depth += 1
+            try:
+                yield
+            except BaseException:
+                self.depth -= 1
+                if outermost:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self.depth -= 1
+            if outermost:
+                self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+
+class SqliteMessageStore(MessageStore):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.table = db.tables["telegram_msgs"]
+
+    def put_many(self, rows):
+        with self.db.transaction():
+            for row in rows:
+                self.table.put(row)
+        return set()
+
+    def get(self, chat_id, msg_id):
+        with self.db.lock:
+            return self.table.get(chat_id=chat_id, msg_id=msg_id)
+
+    def update_text(self, chat_id, msg_id, text, action, updated_at):
+        self.table.update({"chat_id": chat_id, "msg_id": msg_id}, {"text": text, "action": action, "updated_at": updated_at})
+
+
+class OrderExists(Exception):
+    pass
+
+
+class SqliteOrderStore(OrderStore):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.table = db.tables["orders"]
+
+    def create(self, order, audit_row=None):
+        try:
+            with self.db.transaction():
+                if audit_row is not None:
+                    self.db.tables["telegram_msgs"].put(audit_row)
+                if not self.table.put(order, if_absent=True):
+                    # Roll the audit row back too, like a cancelled transaction
+                    raise OrderExists(self.table.get(order_id=order["order_id"]))
+        except OrderExists as e:
+            return e.args[0]
+        return None
+
+    def get(self, order_id):
+        with self.db.lock:
+            return self.table.get(order_id=order_id)
+
+    def update_status(self, order_id, status, updated_at):
+        return self.table.update({"order_id": order_id}, {"status": status, "updated_at": updated_at})
+
+    def record_delivery(self, order_id, delivered, to_chat_id=None, to_msg_id=None):
+        changes = {"delivered": delivered}
+        if to_msg_id is not None:
+            changes.update({"to_chat_id": to_chat_id, "to_msg_id": to_msg_id})
+        self.table.update({"order_id": order_id}, changes)
+
+
+class SqliteConnectionStore(ConnectionStore):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.table = db.tables["websocket_connections"]
+
+    def put(self, connection):
+        with self.db.lock:
+            self.table.put(connection)
+
+    def delete(self, connection_id):
+        with self.db.lock:
+            self.table.delete(connection_id=connection_id)
+
+    def delete_many(self, connection_ids):
+        with self.db.transaction():
+            for connection_id in connection_ids:
+                self.table.delete(connection_id=connection_id)
+
+    def active(self):
+        with self.db.lock:
+            return self.table.query(status=1)
+
+    def for_channel(self, channel_id):
+        with self.db.lock:
+            return self.table.query(channel_id=channel_id, status=1)
+
+    def version(self):
+        with self.db.lock:
+            item = self.table.get(connection_id=self.VERSION_KEY)
+        return item["version"] if item else 0
+
+    def bump_version(self):
+        with self.db.transaction():
+            self.table.update({"connection_id": self.VERSION_KEY}, {"version": self.version() + 1})
+
+
+class SqliteChannelStore(ChannelStore):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.table = db.tables["signal_channels"]
+
+    def active_for_owner(self, owner):
+        with self.db.lock:
+            return self.table.query(owner=owner, status="ACTIVE")
+
+    def active(self):
+        with self.db.lock:
+            return self.table.query(status="ACTIVE")
+
+    def classifier_routes(self):
+        with self.db.lock:
+            channels = self.table.query()
+        return {int(ch["chat_id"]): ch["classifier"] for ch in channels if ch.get("classifier")}
+
+
+class SqliteCredentialStore(CredentialStore):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+
+    def binance_accounts(self, status="ENABLED"):
+        with self.db.lock:
+            return self.db.tables["binance_api_key_secrets"].query(status=status)
+
+    def forex_accounts(self, status="ENABLED"):
+        with self.db.lock:
+            return self.db.tables["forex_account_credentials"].query(status=status)
+
+
+class SqliteDeadLetterStore(DeadLetterStore):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.table = db.tables["dead_letters"]
+
+    def put_many(self, rows):
+        with self.db.transaction():
+            for row in rows:
+                self.table.put(row)
+        return set()
+
+
+def sqlite_storage(path: str = ":memory:") -> Storage:
+    db = SqliteDatabase(path)
+    return Storage(
+        messages=SqliteMessageStore(db),
+        orders=SqliteOrderStore(db),
+        connections=SqliteConnectionStore(db),
+        channels=SqliteChannelStore(db),
+        credentials=SqliteCredentialStore(db),
+        dead_letters=SqliteDeadLetterStore(db),
+        db=db,
+    )
@@ -1,6 +1,5 @@
 import json
-from dynamodb_json import json_util
-from extension import dynamodb
+from storage import get_storage
 from binance import Client
 from binance.enums import *
 from binance.exceptions import BinanceAPIException
@@ -33,17 +32,7 @@ def get_symbol_config(symbol:str, symbols)->dict:
     return next(filter(lambda s: s['symbol'] == symbol, symbols), None)
 
 def handler(event, context):
-    binance_accounts = json_util.loads(dynamodb.query(
-        TableName="binance_api_key_secrets",
-        IndexName="status-index",
-        KeyConditionExpression="#status = :status",
-        ExpressionAttributeNames={
-            "#status": "status"
-        },
-        ExpressionAttributeValues=json_util.dumps({
-            ":status": "ENABLED"
-        }, True)
-    ).get("Items", []))
+    binance_accounts = get_storage().credentials.binance_accounts("ENABLED")
     
     
     for acc in binance_accounts: